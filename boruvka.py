@@ -1,74 +1,189 @@
-import networkx as nx  # used to create and manipulate graphs/networks.
+import igraph as ig  # used to compute the graph layout (in C) for drawing.
+import matplotlib  # used to pick a drawing backend that works without a display (in worker processes).
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt  # used for plotting graphs and visualizing results.
 from matplotlib.animation import FFMpegWriter  # Enables saving animations as .mp4 videos.
+from matplotlib.collections import LineCollection  # Draws many edges with a single call.
 import time  # used to measure execution time.
 from tqdm import tqdm  # used to show a progress bar
-from scipy.io import mmread  # mmread reads Matrix Market (.mtx) files (used for graph input).
+from scipy.io import mmread, mminfo  # mmread reads Matrix Market (.mtx) files (used for graph input), mminfo reads just their header.
 import numpy as np  # used for numerical operations, such as log2 and matrix conversions.
+import hashlib  # used to fingerprint input files for the layout cache.
+import os  # used for file paths and folders.
+from concurrent.futures import ProcessPoolExecutor  # used to process the datasets in parallel.
+from itertools import repeat  # used to pass the same options to every dataset.
+import subprocess  # used to ask ffmpeg which video encoders it can use.
+import argparse  # used to read the command line options.
+try:
+    from numba import njit  # used to compile the Boruvka loop to machine code.
+except ImportError:  # Without Numba the same functions run as plain (much slower) Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]  # Used as @njit
+        return lambda func: func  # Used as @njit(...)
 
-# Boruvka's Algorithm to find MST
-def boruvka_mst(G):
-    num_components = len(G.nodes)  # Start with each node as its own component
-    component = {node: node for node in G.nodes}  # Track which component each node belongs to
-    mst = []  # List to store MST edges
-    total_weight = 0  # Total weight of MST
+# Most frames rendered per video, larger runs are sampled evenly (the last frame always shows the full result)
+MAX_FRAMES = 300
+
+# Folder where computed node layouts are kept between runs
+LAYOUT_CACHE_DIR = ".layout_cache"
+
+# Largest graph laid out with Kamada-Kawai (it needs all-pairs distances, so time and memory grow with N^2); bigger ones use grid Fruchterman-Reingold
+KAMADA_KAWAI_MAX_NODES = 2000
+
+# Types the compiled kernels are built for: node ids are int32, weights are int32, float32 or float64 (see load_graph)
+WEIGHT_TYPES = ['int32', 'float32', 'float64']
+
+# Hardware H.264 encoders to try (in this order) with the options used for each, libx264 is the software fallback
+HARDWARE_ENCODERS = [
+    ('h264_nvenc', ['-preset', 'p1', '-tune', 'll', '-rc', 'vbr', '-cq', '28']),  # NVIDIA
+    ('h264_qsv', ['-preset', 'veryfast']),  # Intel Quick Sync
+    ('h264_videotoolbox', ['-realtime', '1']),  # macOS
+]
+
+# Union-Find: find the root of x's component (with path compression)
+@njit(cache=True)
+def _find(parent, x):
+    root = x
+    while parent[root] != root:  # Walk up until we reach the root
+        root = parent[root]
+    while parent[x] != root:  # Point every node on the path directly to the root
+        next_x = parent[x]
+        parent[x] = root
+        x = next_x
+    return root
+
+# Compiled Boruvka driver working on edge arrays (edge i goes from u[i] to v[i] with weight w[i])
+# The edges must be sorted by weight, so the first live edge seen for a component is its cheapest one
+@njit([f'(int32[::1], int32[::1], {t}[::1], int64)' for t in WEIGHT_TYPES], cache=True, boundscheck=False)
+def _boruvka(u, v, w, N):
+    parent = np.arange(N, dtype=np.int32)  # Union-Find: each node starts as its own parent
+    size = np.ones(N, dtype=np.int32)  # Union-Find: number of nodes in each component
+    roots = np.empty(N, np.int32)  # Component of every node for the current round
+    cheapest_idx = np.full(N, -1, np.int32)  # Cheapest edge index for each component (indexed by root), -1 if none yet
+    mst_idx = np.empty(max(N - 1, 0), np.int64)  # Indices of the edges added to the MST
+    num_mst = 0  # Number of MST edges found so far
+    total_weight = 0.0  # Total weight of MST
+    num_components = N  # Start with each node as its own component
 
     while num_components > 1:  # Repeat until all nodes are in one component
-        cheapest = {node: None for node in G.nodes}  # Store cheapest edge for each component
+        cheapest_idx.fill(-1)  # Reset the cheapest edges for this round (the buffer is reused, not reallocated)
+        for x in range(N):  # Look up every node's component for this round
+            roots[x] = _find(parent, x)
 
-        for u, v, weight in G.edges(data=True):  # Check all edges
-            comp_u = component[u]  # Component of u
-            comp_v = component[v]  # Component of v
+        for i in range(len(u)):  # Check all edges, lightest first
+            comp_u = roots[u[i]]  # Component of u
+            comp_v = roots[v[i]]  # Component of v
 
             if comp_u != comp_v:  # If u and v are in different components
-                if cheapest[comp_u] is None or cheapest[comp_u][2]['weight'] > weight['weight']:
-                    cheapest[comp_u] = (u, v, weight)  # Update cheapest edge for u's component
-                if cheapest[comp_v] is None or cheapest[comp_v][2]['weight'] > weight['weight']:
-                    cheapest[comp_v] = (u, v, weight)  # Update cheapest edge for v's component
-
-        for comp, edge in cheapest.items():  # Add valid cheapest edges
-            if edge:
-                u, v, weight = edge
-                if component[u] != component[v]:  # Still in different components
-                    mst.append((u, v, weight['weight']))  # Add edge to MST
-                    total_weight += weight['weight']  # Add weight to total
-
-                    old_component = component[u]  # Get u's component
-                    new_component = component[v]  # Get v's component
-
-                    for node in component:  # Merge components
-                        if component[node] == old_component:
-                            component[node] = new_component
-                    num_components -= 1  # One less component
-        cheapest = {node: None for node in G.nodes}  # Reset for next round
+                if cheapest_idx[comp_u] < 0:
+                    cheapest_idx[comp_u] = i  # Cheapest edge for u's component
+                if cheapest_idx[comp_v] < 0:
+                    cheapest_idx[comp_v] = i  # Cheapest edge for v's component
+
+        merged = False  # Whether this round joined any components
+        for c in range(N):  # Add valid cheapest edges
+            i = cheapest_idx[c]
+            if i < 0:
+                continue  # No edge leaves this component (or c is not a root)
+            root_u = _find(parent, u[i])
+            root_v = _find(parent, v[i])
+            if root_u != root_v:  # Still in different components, so merge them (union by size)
+                if size[root_u] < size[root_v]:
+                    root_u, root_v = root_v, root_u
+                parent[root_v] = root_u
+                size[root_u] += size[root_v]
+                mst_idx[num_mst] = i  # Add edge to MST
+                num_mst += 1
+                total_weight += float(w[i])  # Add weight to total (as a Python float, adding a NumPy float32 would keep the sum in float32)
+                num_components -= 1  # One less component
+                merged = True
+                if num_components == 1:
+                    break  # Everything is connected, the remaining cheapest edges can only form cycles
+
+        if not merged:
+            break  # No edges left between components (the graph is disconnected)
+
+    return mst_idx[:num_mst], total_weight  # Return MST edge indices and total weight
 
+# Boruvka's Algorithm to find MST
+def boruvka_mst(u, v, w, N):
+    # Sort the edges by weight once, instead of comparing weights for every edge in every round
+    order = np.argsort(w, kind='stable')
+
+    # Run the compiled Boruvka driver on the sorted edge arrays
+    mst_idx, total_weight = _boruvka(u[order], v[order], w[order], N)
+
+    mst_idx = order[mst_idx]  # Back to indices into the original edge arrays
+    mst = [(int(u[i]), int(v[i]), float(w[i])) for i in mst_idx]  # List of MST edges
     return mst, total_weight  # Return MST and total weight
 
 # Function to load the graph from a file
 def load_graph(file_path):
-    # Load the graph data from a .mtx file
-    data = mmread(file_path).toarray()  # Turns the matrix into a 2D NumPy array
-    G = nx.from_numpy_array(data)  # Convert to NetworkX graph (from numpy array)
-
-    # Loop through all edges in the graph
-    for u, v, data in G.edges(data=True):
-        # If any edge has a negative weight
-        if data['weight'] < 0:
-            data['weight'] += 1.5  # Adjust negative weight to positive + 1.5
-            
-    return G # Return the final graph
+    # Load the graph data from a .mtx file as a sparse matrix (only the non-zero entries are stored)
+    coo = mmread(file_path).tocoo()
+    coo.sum_duplicates()  # Repeated entries add up, like in the dense matrix
+    nonzero = coo.data != 0  # Zero entries are not edges
+    row, col, data = coo.row[nonzero], coo.col[nonzero], coo.data[nonzero]
+
+    # Keep every undirected edge once (symmetric files store each edge as both (i, j) and (j, i)).
+    # When both are stored, the lower-triangle value wins, the same as when building the graph with NetworkX.
+    first_end = np.minimum(row, col)
+    second_end = np.maximum(row, col)
+    order = np.lexsort((row < col, second_end, first_end))  # Group the copies of each edge, lower-triangle copy first
+    first_copy = np.ones(len(order), dtype=bool)
+    first_copy[1:] = (first_end[order][1:] != first_end[order][:-1]) | (second_end[order][1:] != second_end[order][:-1])
+    edges = order[first_copy]
+
+    # Edge i goes from u[i] to v[i] with weight w[i]
+    u = first_end[edges].astype(np.int32)
+    v = second_end[edges].astype(np.int32)
+    w = data[edges].astype(np.float64)
+
+    w[w < 0] += 1.5  # Adjust negative weights to positive + 1.5
+
+    # Store the weights in 4 bytes where that stays exact enough (halves the memory read by the edge loops)
+    max_weight = np.abs(w).max(initial=0)
+    if np.all(w == np.floor(w)) and max_weight < 2**31:
+        w = w.astype(np.int32)  # Integer weights (e.g. unit weights) are kept as integers
+    elif max_weight < 2**24:
+        w = w.astype(np.float32)  # Larger values keep float64 so big weights are not rounded
+
+    return u, v, w, coo.shape[0]  # Return the edge arrays and the number of nodes
+
+# Function to lay out the nodes, cached on disk per input file so reruns skip the layout
+def compute_layout(file_path, g, use_cache=True):
+    with open(file_path, 'rb') as f:
+        key = hashlib.md5(f.read()).hexdigest()  # Changes whenever the file contents change
+    cache_path = os.path.join(LAYOUT_CACHE_DIR, f"boruvka_{key}.npy")
+
+    if use_cache and os.path.exists(cache_path):
+        return np.load(cache_path)  # Reuse the layout from an earlier run
+
+    N = g.vcount()  # Number of nodes
+    if N <= KAMADA_KAWAI_MAX_NODES:
+        pos = np.array(g.layout_kamada_kawai().coords)  # Kamada-Kawai layout (row i is the position of node i)
+    else:
+        # Fixed starting positions so reruns give the same picture, spread around the origin like igraph's own random start
+        # (the grid it uses to find nearby nodes is centred there, packing the nodes into a corner makes it very slow)
+        seed = ((np.random.default_rng(0).random((N, 2)) - 0.5) * np.sqrt(N)).tolist()
+        pos = np.array(g.layout_fruchterman_reingold(seed=seed, niter=50, grid=True).coords)  # Close to linear in N
+    if use_cache:
+        os.makedirs(LAYOUT_CACHE_DIR, exist_ok=True)
+        np.save(cache_path, pos)
+    return pos
 
 # Main function for animation and video creation
-def create_mst_video(file_path, output_video="boruvka_mst_video.mp4"):
+def create_mst_video(file_path, output_video="boruvka_mst_video.mp4", max_frames=MAX_FRAMES, use_cache=True, codec='h264', extra_args=None):
     # Load graph from file
-    G = load_graph(file_path)
-    print(f"Loaded graph with {len(G.nodes)} nodes and {len(G.edges)} edges")
+    u, v, w, N = load_graph(file_path)
+    print(f"Loaded graph with {N} nodes and {len(u)} edges")
 
     # Start timer for the algorithm execution time
     start_time_algorithm = time.time()
 
     # Run Borůvka's Algorithm to find the MST
-    mst, mst_weight = boruvka_mst(G)
+    mst, mst_weight = boruvka_mst(u, v, w, N)
     
     # Stop timer for the algorithm execution time
     end_time_algorithm = time.time()
@@ -82,48 +197,52 @@ def create_mst_video(file_path, output_video="boruvka_mst_video.mp4"):
     # Prepare the figure and axes for animation
     fig, ax = plt.subplots(figsize=(12, 12))
     ax.axis('off')
-    pos = nx.kamada_kawai_layout(G)  # Layout for nodes
+
+    # Lay out the MST with igraph (implemented in C), it is just used for the drawing
+    mst_u = np.array([a for a, _, _ in mst], dtype=np.int64)  # First end of every MST edge
+    mst_v = np.array([b for _, b, _ in mst], dtype=np.int64)  # Second end of every MST edge
+    g = ig.Graph(n=N, edges=list(zip(mst_u.tolist(), mst_v.tolist())))
+    pos = compute_layout(file_path, g, use_cache)  # Layout for nodes (row i is the position of node i)
+
+    # Line segments of all MST edges, in the order they were added
+    segments = np.stack([pos[mst_u], pos[mst_v]], axis=1)
     
     # Calculate the computational cost (empirical complexity)
-    computational_cost = len(G.edges) * np.log2(len(G.nodes)) # O(E log V)
+    computational_cost = len(u) * np.log2(N) # O(E log V)
     print(f"Computational cost (empirical complexity): {computational_cost}")
     
-    # Function to update the animation frame
-    def update(frame, computational_cost, algorithm_execution_time):
-        ax.clear()
-        ax.axis('off')
+    # Draw the parts of the frame that never change only once
+    ax.scatter(pos[:, 0], pos[:, 1], s=8, c='#B0B0B0', zorder=2)  # Nodes (drawn over the edges)
+    ax.add_collection(LineCollection(segments, colors='red', linewidths=0.5, zorder=1))  # All MST edges in red
+    mst_lines = LineCollection([], colors='#3D5C7E', linewidths=2, zorder=1)  # MST edges added so far (drawn over the red ones)
+    ax.add_collection(mst_lines)
+
+    # Add execution time and MST cost, along with computational cost on the left of the graph
+    ax.text(-0.1, 0.9, f"Total MST Cost: {mst_weight:.2f}", transform=ax.transAxes, ha="left", va="top", fontsize=12)
+    ax.text(-0.1, 0.85, f"Algorithm Execution Time: {algorithm_execution_time:.6f} sec", transform=ax.transAxes, ha="left", va="top", fontsize=12)
+    ax.text(-0.1, 0.8, f"Computational Cost: {computational_cost:.2f}", transform=ax.transAxes, ha="left", va="top", fontsize=12)
+    
+    # Function to update the animation frame (only the title and the blue MST edges change)
+    def update(frame):
         ax.set_title(f"Borůvka's Algorithm: Step {frame + 1}/{len(mst)}", fontsize=16)
         
-        # Draw nodes
-        nx.draw_networkx_nodes(G, pos, ax=ax, node_size=8, node_color='#B0B0B0')
-        
         # Draw MST edges added so far in a darker blue
-        for i in range(frame + 1):
-            u, v, weight = mst[i]
-            color = '#3D5C7E'
-            nx.draw_networkx_edges(G, pos, edgelist=[(u, v)], edge_color=color, width=2, ax=ax)
-        
-        # Draw remaining edges in red
-        remaining_edges = mst[frame + 1:]
-        for u, v, weight in remaining_edges:
-            color = 'red'
-            nx.draw_networkx_edges(G, pos, edgelist=[(u, v)], edge_color=color, width=0.5, ax=ax)
-        
-        # Add live execution time and MST cost, along with computational cost on the left of the graph
-        ax.text(-0.1, 0.9, f"Total MST Cost: {mst_weight:.2f}", transform=ax.transAxes, ha="left", va="top", fontsize=12)
-        ax.text(-0.1, 0.85, f"Algorithm Execution Time: {algorithm_execution_time:.6f} sec", transform=ax.transAxes, ha="left", va="top", fontsize=12)
-        ax.text(-0.1, 0.8, f"Computational Cost: {computational_cost:.2f}", transform=ax.transAxes, ha="left", va="top", fontsize=12)
+        mst_lines.set_segments(segments[:frame + 1])
     
     # Initialize the video writer using FFmpeg
-    writer = FFMpegWriter(fps=30)
+    writer = FFMpegWriter(fps=30, codec=codec, extra_args=extra_args)
     
     total_frames = len(mst)
+    step = max(1, -(-total_frames // max_frames))  # Render every step-th frame (rounded up to stay within max_frames)
+    frames = list(range(0, total_frames, step))
+    if frames and frames[-1] != total_frames - 1:
+        frames.append(total_frames - 1)  # Always finish on the complete result
     
     # Create the animation with a progress bar
-    with tqdm(total=total_frames, desc="Rendering frames", ncols=100, unit="frame") as pbar:
+    with tqdm(total=len(frames), desc="Rendering frames", ncols=100, unit="frame") as pbar:
         with writer.saving(fig, output_video, dpi=100):
-            for i in range(total_frames):
-                update(i, computational_cost, algorithm_execution_time)
+            for i in frames:
+                update(i)
                 writer.grab_frame()
                 pbar.update(1)
     
@@ -131,15 +250,66 @@ def create_mst_video(file_path, output_video="boruvka_mst_video.mp4"):
 
     return computational_cost
 
-# Main function to handle multiple datasets
-def process_multiple_files(file_paths):
-    for index, file_path in enumerate(file_paths):
-        output_video = f"{index+1}_dataset_boruvka.mp4"
-        print(f"Processing {file_path}...")
-        computational_cost = create_mst_video(file_path, output_video)
-        print(f"Empirical Computational Cost for {file_path}: {computational_cost}")
+# Function to pick the fastest H.264 encoder that works on this machine, returns (codec, extra ffmpeg args)
+def best_ffmpeg_encoder():
+    ffmpeg = matplotlib.rcParams['animation.ffmpeg_path']
+    try:
+        encoders = subprocess.run([ffmpeg, '-hide_banner', '-encoders'], capture_output=True, text=True).stdout
+    except OSError:
+        encoders = ''  # ffmpeg could not be started, let FFMpegWriter report it later
+
+    for codec, extra_args in HARDWARE_ENCODERS:
+        if codec not in encoders:
+            continue
+        # An encoder can be built into ffmpeg without the hardware being present, so try a tiny encode first
+        test = subprocess.run([ffmpeg, '-hide_banner', '-loglevel', 'error', '-f', 'lavfi', '-i', 'color=size=256x256:duration=0.1',
+                               '-c:v', codec, '-f', 'null', '-'], capture_output=True)
+        if test.returncode == 0:
+            return codec, extra_args + ['-pix_fmt', 'yuv420p']
+
+    if 'libx264' in encoders:
+        return 'libx264', ['-preset', 'ultrafast', '-pix_fmt', 'yuv420p']
+    return 'h264', None  # Let ffmpeg pick its default H.264 encoder
+
+# Rough peak memory needed to process one dataset (edge arrays, layout and the figure)
+def estimate_memory(file_path):
+    num_nodes, _, num_entries, _, _, _ = mminfo(file_path)  # Only reads the file header
+    memory = num_entries * 64 + num_nodes * 64 + 200 * 2**20
+    if num_nodes <= KAMADA_KAWAI_MAX_NODES:
+        memory += num_nodes * num_nodes * 8  # Kamada-Kawai keeps an N x N matrix of distances
+    return memory
+
+# Function to process one dataset (kept at the top level so worker processes can run it)
+def process_file(index, file_path, max_frames, use_cache, encoder):
+    output_video = f"{index+1}_dataset_boruvka.mp4"
+    print(f"Processing {file_path}...")
+    computational_cost = create_mst_video(file_path, output_video, max_frames, use_cache, *encoder)
+    print(f"Empirical Computational Cost for {file_path}: {computational_cost}")
+    return computational_cost
+
+# Main function to handle multiple datasets (each dataset runs in its own process)
+def process_multiple_files(file_paths, max_frames=MAX_FRAMES, use_cache=True):
+    max_workers = min(len(file_paths), os.cpu_count() or 1)
+    encoder = best_ffmpeg_encoder()  # Probed once and shared by all datasets
+
+    # Warn if the datasets running at the same time may not fit in memory
+    try:
+        total_memory = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError):
+        total_memory = None  # Not available on this system
+    needed_memory = sum(sorted((estimate_memory(file_path) for file_path in file_paths), reverse=True)[:max_workers])
+    if total_memory is not None and needed_memory > total_memory:
+        print(f"Warning: processing {max_workers} datasets at once may need about {needed_memory / 2**30:.1f} GB "
+              f"but only {total_memory / 2**30:.1f} GB of RAM is available")
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(process_file, range(len(file_paths)), file_paths, repeat(max_frames), repeat(use_cache), repeat(encoder)))
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Borůvka's MST on the selected networks")
+    parser.add_argument("--no-cache", action="store_true", help="recompute the node layouts instead of reusing cached ones")
+    args = parser.parse_args()
+
     file_paths = [
         "USAir97.mtx",
         "G13.mtx",
@@ -147,4 +317,4 @@ if __name__ == "__main__":
         "lhr04c.mtx",
         "amazon0302.mtx"
     ]
-    process_multiple_files(file_paths)
+    process_multiple_files(file_paths, use_cache=not args.no_cache)
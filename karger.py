@@ -1,57 +1,210 @@
-import networkx as nx  # used to create and manipulate graphs/networks.
+import matplotlib  # used to pick a drawing backend that works without a display (in worker processes).
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt  # used for plotting graphs and visualizing results.
 from matplotlib.animation import FFMpegWriter  # Enables saving animations as .mp4 videos.
+from matplotlib.collections import LineCollection  # Draws many edges with a single call.
+import igraph as ig  # used to compute the graph layout (in C) for drawing.
 import time  # used to measure execution time.
 from tqdm import tqdm  # used to show a progress bar
-from scipy.io import mmread  # mmread reads Matrix Market (.mtx) files (used for graph input).
-import random
+from scipy.io import mmread, mminfo  # mmread reads Matrix Market (.mtx) files (used for graph input), mminfo reads just their header.
+import numpy as np  # used for numerical operations on the edge arrays.
+import argparse  # used to read the command line options.
+import hashlib  # used to fingerprint input files for the layout cache.
+import os  # used for file paths and folders.
+from concurrent.futures import ProcessPoolExecutor  # used to process the datasets in parallel.
+from itertools import repeat  # used to pass the same options to every dataset.
+import subprocess  # used to ask ffmpeg which video encoders it can use.
+try:
+    from numba import njit, prange  # used to compile the Karger trials to machine code and run them in parallel.
+except ImportError:  # Without Numba the same functions run as plain (much slower) Python
+    prange = range
 
-# Karger's Algorithm to find the Minimum Cut
-def karger_min_cut(G):
-    contraction_steps = []  # Store how the graph changes during each contraction (for visualization)
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]  # Used as @njit
+        return lambda func: func  # Used as @njit(...)
+
+# Default amount of work (edge visits) to spend on Karger trials when the number of trials is not given
+TRIAL_EDGE_BUDGET = 10**8
+
+# Most frames rendered per video, larger runs are sampled evenly (the last frame always shows the full result)
+MAX_FRAMES = 300
+
+# Folder where computed node layouts are kept between runs
+LAYOUT_CACHE_DIR = ".layout_cache"
+
+# Largest graph laid out with Kamada-Kawai (it needs all-pairs distances, so time and memory grow with N^2); bigger ones use grid Fruchterman-Reingold
+KAMADA_KAWAI_MAX_NODES = 2000
+
+# Types the compiled kernels are built for: node ids are int32, weights are int32, float32 or float64 (see load_graph)
+WEIGHT_TYPES = ['int32', 'float32', 'float64']
+
+# Hardware H.264 encoders to try (in this order) with the options used for each, libx264 is the software fallback
+HARDWARE_ENCODERS = [
+    ('h264_nvenc', ['-preset', 'p1', '-tune', 'll', '-rc', 'vbr', '-cq', '28']),  # NVIDIA
+    ('h264_qsv', ['-preset', 'veryfast']),  # Intel Quick Sync
+    ('h264_videotoolbox', ['-realtime', '1']),  # macOS
+]
+
+# Union-Find: find the supernode that x has been merged into (with path compression)
+@njit(cache=True)
+def _find(parent, x):
+    root = x
+    while parent[root] != root:  # Walk up until we reach the root
+        root = parent[root]
+    while parent[x] != root:  # Point every node on the path directly to the root
+        next_x = parent[x]
+        parent[x] = root
+        x = next_x
+    return root
+
+# One run of Karger's contraction, seeded so that the same trial can be replayed
+@njit([f'(int32[::1], int32[::1], {t}[::1], int64, int64)' for t in WEIGHT_TYPES], cache=True)
+def _karger_trial(u, v, w, N, seed):
+    np.random.seed(seed)  # Every thread has its own random state, seed it for this trial
+    parent = np.arange(N, dtype=np.int32)  # Union-Find: each node starts as its own supernode
+    size = np.ones(N, dtype=np.int32)  # Union-Find: number of nodes merged into each supernode
+    remaining_components = N  # Number of supernodes left
+    contracted = np.empty(max(N - 2, 0), np.int64)  # Index of the edge contracted at each step
+    num_contracted = 0
+
+    # Contracting the edges in a random order is the same as repeatedly picking a random remaining edge.
+    # The order is shuffled lazily (Fisher-Yates), so a trial that finishes early only draws the edges it uses.
+    order = np.arange(len(u))  # order[k:] holds the edges that have not been picked yet
+    for k in range(len(order)):
+        if remaining_components <= 2:
+            break  # Keep reducing the graph until only two supernodes are left
 
-    while len(G.nodes) > 2:  # Keep reducing the graph until only two nodes are left
-        u, v = random.choice(list(G.edges()))  # Randomly pick an edge (u, v)
+        j = np.random.randint(k, len(order))  # Pick a random edge among the ones not picked yet
+        order[k], order[j] = order[j], order[k]
+        i = order[k]
+        root_u = _find(parent, u[i])  # Supernode of u
+        root_v = _find(parent, v[i])  # Supernode of v
+        if root_u == root_v:
+            continue  # Edge inside a supernode (a self-loop after contraction), skip it
 
-        # Merge node v into node u (combine them into a single node)
-        # Remove self-loops (edges connecting a node to itself)
-        G = nx.contracted_nodes(G, u, v, self_loops=False)
+        # Merge the smaller supernode into the larger one
+        if size[root_u] < size[root_v]:
+            root_u, root_v = root_v, root_u
+        parent[root_v] = root_u
+        size[root_u] += size[root_v]
+        remaining_components -= 1
 
-        contraction_steps.append(list(G.edges(data=True)))  # Save the current list of edges for this step
+        contracted[num_contracted] = i  # Save the edge contracted at this step
+        num_contracted += 1
 
-    # After all contractions, the remaining edges between the two supernodes form the minimum cut
-    min_cut_edges = list(G.edges(data=True))  # Get all edges left in the graph (now between only 2 nodes)
+    # After all contractions, the edges between the two supernodes form the cut
+    roots = np.empty(N, np.int32)  # Supernode of every node
+    for x in range(N):
+        roots[x] = _find(parent, x)
+    cut_weight = 0.0
+    for i in range(len(u)):
+        if roots[u[i]] != roots[v[i]]:
+            cut_weight += float(w[i])  # As a Python float, adding a NumPy float32 would keep the sum in float32
 
-    # Calculate the total weight of these edges to get the minimum cut value
-    min_cut_weight = sum(weight['weight'] for _, _, weight in min_cut_edges)
+    return cut_weight, contracted[:num_contracted], roots
+
+# Run many independent Karger trials in parallel and return the cut weight found by each
+# (compiled on first call, not at import: starting Numba's threading layer before the worker processes are forked hangs the exit)
+@njit(cache=True, parallel=True)
+def _karger_trials(u, v, w, N, num_trials):
+    cut_weights = np.empty(num_trials)
+    for t in prange(num_trials):
+        cut_weights[t] = _karger_trial(u, v, w, N, t)[0]
+    return cut_weights
+
+# Karger's Algorithm to find the Minimum Cut
+def karger_min_cut(u, v, w, N, num_trials=None):
+    # Self-loops can never be cut, leave them out of the trials
+    keep = u != v
+    u, v, w = u[keep], v[keep], w[keep]
+
+    # A single trial finds the minimum cut only with small probability, so run many and keep the best
+    if num_trials is None:
+        num_trials = max(1, TRIAL_EDGE_BUDGET // max(len(u), 1))
+    cut_weights = _karger_trials(u, v, w, N, num_trials)
+    best_trial = int(np.argmin(cut_weights))
+
+    # Replay the best trial to get its contraction steps and the two supernodes
+    min_cut_weight, contracted, roots = _karger_trial(u, v, w, N, best_trial)
+    contraction_steps = [(int(u[i]), int(v[i])) for i in contracted]  # Edge (u, v) contracted at each step
+
+    # The edges between the two supernodes form the minimum cut
+    cut = np.flatnonzero(roots[u] != roots[v])
+    min_cut_edges = [(int(u[i]), int(v[i]), float(w[i])) for i in cut]
 
     return contraction_steps, min_cut_edges, min_cut_weight  # Return all steps, final cut edges, and total cut weight
 
 # Function to load the graph from a file
 def load_graph(file_path):
-    # Load the graph data from a .mtx file
-    data = mmread(file_path).toarray()  # Turns the matrix into a 2D NumPy array
-    G = nx.from_numpy_array(data)  # Convert to NetworkX graph (from numpy array)
-
-    # Loop through all edges in the graph
-    for u, v, data in G.edges(data=True):
-        # If any edge has a negative weight
-        if data['weight'] < 0:
-            data['weight'] += 1.5  # Adjust negative weight to positive + 1.5
-            
-    return G # Return the final graph
+    # Load the graph data from a .mtx file as a sparse matrix (only the non-zero entries are stored)
+    coo = mmread(file_path).tocoo()
+    coo.sum_duplicates()  # Repeated entries add up, like in the dense matrix
+    nonzero = coo.data != 0  # Zero entries are not edges
+    row, col, data = coo.row[nonzero], coo.col[nonzero], coo.data[nonzero]
+
+    # Keep every undirected edge once (symmetric files store each edge as both (i, j) and (j, i)).
+    # When both are stored, the lower-triangle value wins, the same as when building the graph with NetworkX.
+    first_end = np.minimum(row, col)
+    second_end = np.maximum(row, col)
+    order = np.lexsort((row < col, second_end, first_end))  # Group the copies of each edge, lower-triangle copy first
+    first_copy = np.ones(len(order), dtype=bool)
+    first_copy[1:] = (first_end[order][1:] != first_end[order][:-1]) | (second_end[order][1:] != second_end[order][:-1])
+    edges = order[first_copy]
+
+    # Edge i goes from u[i] to v[i] with weight w[i]
+    u = first_end[edges].astype(np.int32)
+    v = second_end[edges].astype(np.int32)
+    w = data[edges].astype(np.float64)
+
+    w[w < 0] += 1.5  # Adjust negative weights to positive + 1.5
+
+    # Store the weights in 4 bytes where that stays exact enough (halves the memory read by the edge loops)
+    max_weight = np.abs(w).max(initial=0)
+    if np.all(w == np.floor(w)) and max_weight < 2**31:
+        w = w.astype(np.int32)  # Integer weights (e.g. unit weights) are kept as integers
+    elif max_weight < 2**24:
+        w = w.astype(np.float32)  # Larger values keep float64 so big weights are not rounded
+
+    return u, v, w, coo.shape[0]  # Return the edge arrays and the number of nodes
+
+# Function to lay out the nodes, cached on disk per input file so reruns skip the layout
+def compute_layout(file_path, g, use_cache=True):
+    with open(file_path, 'rb') as f:
+        key = hashlib.md5(f.read()).hexdigest()  # Changes whenever the file contents change
+    cache_path = os.path.join(LAYOUT_CACHE_DIR, f"karger_{key}.npy")
+
+    if use_cache and os.path.exists(cache_path):
+        return np.load(cache_path)  # Reuse the layout from an earlier run
+
+    N = g.vcount()  # Number of nodes
+    if N <= KAMADA_KAWAI_MAX_NODES:
+        pos = np.array(g.layout_kamada_kawai().coords)  # Kamada-Kawai layout (row i is the position of node i)
+    else:
+        # Fixed starting positions so reruns give the same picture, spread around the origin like igraph's own random start
+        # (the grid it uses to find nearby nodes is centred there, packing the nodes into a corner makes it very slow)
+        seed = ((np.random.default_rng(0).random((N, 2)) - 0.5) * np.sqrt(N)).tolist()
+        pos = np.array(g.layout_fruchterman_reingold(seed=seed, niter=50, grid=True).coords)  # Close to linear in N
+    if use_cache:
+        os.makedirs(LAYOUT_CACHE_DIR, exist_ok=True)
+        np.save(cache_path, pos)
+    return pos
 
 # Main function for animation and video creation
-def create_mst_video(file_path, output_video="karger_mst_video.mp4"):
+def create_mst_video(file_path, output_video="karger_mst_video.mp4", num_trials=None, max_frames=MAX_FRAMES, use_cache=True, codec='h264', extra_args=None):
     # Load graph from file
-    G = load_graph(file_path)
-    print(f"Loaded graph with {len(G.nodes)} nodes and {len(G.edges)} edges")
+    u, v, w, N = load_graph(file_path)
+    print(f"Loaded graph with {N} nodes and {len(u)} edges")
+
+    # Compile (or load from Numba's cache) the parallel trials for this weight type on a 2-node graph, so it is not timed below
+    # (done here in the worker process, starting Numba's threading layer in the parent before the fork would hang its exit)
+    _karger_trials(np.zeros(1, np.int32), np.ones(1, np.int32), np.ones(1, w.dtype), 2, 1)
 
     # Start timer for the algorithm execution time
     start_time_algorithm = time.time()
 
     # Run Karger's Algorithm to find the minimum cut
-    contraction_steps, min_cut_edges, min_cut_weight = karger_min_cut(G)
+    contraction_steps, min_cut_edges, min_cut_weight = karger_min_cut(u, v, w, N, num_trials)
     print(f"Minimum Cut has {len(min_cut_edges)} edges with total weight: {min_cut_weight}")
 
     # Stop timer for the algorithm execution time
@@ -64,42 +217,50 @@ def create_mst_video(file_path, output_video="karger_mst_video.mp4"):
     # Prepare the figure and axes for animation
     fig, ax = plt.subplots(figsize=(12, 12))
     ax.axis('off')
-    pos = nx.kamada_kawai_layout(G)  # Layout for nodes
+
+    # Lay out the graph with igraph (implemented in C), it is just used for the drawing
+    g = ig.Graph(n=N, edges=list(zip(u.tolist(), v.tolist())))
+    pos = compute_layout(file_path, g, use_cache)  # Layout for nodes (row i is the position of node i)
     
     # Calculate the computational cost (empirical complexity)
-    computational_cost = len(G.nodes) * len(G.nodes)  # O(V*V)
+    computational_cost = N * N  # O(V*V)
     print(f"Computational cost (empirical complexity): {computational_cost}")
     
-    # Function to update the animation frame
-    def update(frame, computational_cost, algorithm_execution_time):
-        ax.clear()
-        ax.axis('off')
+    # Line segments of all contracted edges, in the order they were contracted
+    contracted = np.array(contraction_steps, dtype=np.int64).reshape(-1, 2)
+    segments = np.stack([pos[contracted[:, 0]], pos[contracted[:, 1]]], axis=1)
+    
+    # Draw the parts of the frame that never change only once
+    ax.scatter(pos[:, 0], pos[:, 1], s=8, c='#B0B0B0', zorder=2)  # Nodes (drawn over the edges)
+    contracted_lines = LineCollection([], colors='#3D5C7E', linewidths=2, zorder=1)  # Edges contracted so far
+    ax.add_collection(contracted_lines)
+
+    # Add execution time and minimum cut cost, along with computational cost on the left of the graph
+    ax.text(-0.1, 0.9, f"Total Min Cut Cost: {min_cut_weight:.2f}", transform=ax.transAxes, ha="left", va="top", fontsize=12)
+    ax.text(-0.1, 0.85, f"Algorithm Execution Time: {algorithm_execution_time:.6f} sec", transform=ax.transAxes, ha="left", va="top", fontsize=12)
+    ax.text(-0.1, 0.8, f"Computational Cost: {computational_cost:.2f}", transform=ax.transAxes, ha="left", va="top", fontsize=12)
+    
+    # Function to update the animation frame (only the title and the contracted edges change)
+    def update(frame):
         ax.set_title(f"Karger's Algorithm: Step {frame + 1}/{len(contraction_steps)}", fontsize=16)
         
-        # Draw nodes
-        nx.draw_networkx_nodes(G, pos, ax=ax, node_size=8, node_color='#B0B0B0')
-        
-        # Draw the edges that were contracted in this step
-        edges_at_step = contraction_steps[frame]
-        for u, v, weight in edges_at_step:
-            color = '#3D5C7E'
-            nx.draw_networkx_edges(G, pos, edgelist=[(u, v)], edge_color=color, width=2, ax=ax)
-        
-        # Add live execution time and minimum cut cost, along with computational cost on the left of the graph
-        ax.text(-0.1, 0.9, f"Total Min Cut Cost: {min_cut_weight:.2f}", transform=ax.transAxes, ha="left", va="top", fontsize=12)
-        ax.text(-0.1, 0.85, f"Algorithm Execution Time: {algorithm_execution_time:.6f} sec", transform=ax.transAxes, ha="left", va="top", fontsize=12)
-        ax.text(-0.1, 0.8, f"Computational Cost: {computational_cost:.2f}", transform=ax.transAxes, ha="left", va="top", fontsize=12)
+        # Draw the edges that were contracted so far
+        contracted_lines.set_segments(segments[:frame + 1])
     
     # Initialize the video writer using FFmpeg
-    writer = FFMpegWriter(fps=30)
+    writer = FFMpegWriter(fps=30, codec=codec, extra_args=extra_args)
     
     total_frames = len(contraction_steps)
+    step = max(1, -(-total_frames // max_frames))  # Render every step-th frame (rounded up to stay within max_frames)
+    frames = list(range(0, total_frames, step))
+    if frames and frames[-1] != total_frames - 1:
+        frames.append(total_frames - 1)  # Always finish on the complete result
     
     # Create the animation with a progress bar
-    with tqdm(total=total_frames, desc="Rendering frames", ncols=100, unit="frame") as pbar:
+    with tqdm(total=len(frames), desc="Rendering frames", ncols=100, unit="frame") as pbar:
         with writer.saving(fig, output_video, dpi=100):
-            for i in range(total_frames):
-                update(i, computational_cost, algorithm_execution_time)
+            for i in frames:
+                update(i)
                 writer.grab_frame()
                 pbar.update(1)
     
@@ -107,15 +268,68 @@ def create_mst_video(file_path, output_video="karger_mst_video.mp4"):
 
     return computational_cost
 
-# Main function to handle multiple datasets
-def process_multiple_files(file_paths):
-    for index, file_path in enumerate(file_paths):
-        output_video = f"{index+1}_dataset_karger.mp4"
-        print(f"Processing {file_path}...")
-        computational_cost = create_mst_video(file_path, output_video)
-        print(f"Empirical Computational Cost for {file_path}: {computational_cost}")
+# Function to pick the fastest H.264 encoder that works on this machine, returns (codec, extra ffmpeg args)
+def best_ffmpeg_encoder():
+    ffmpeg = matplotlib.rcParams['animation.ffmpeg_path']
+    try:
+        encoders = subprocess.run([ffmpeg, '-hide_banner', '-encoders'], capture_output=True, text=True).stdout
+    except OSError:
+        encoders = ''  # ffmpeg could not be started, let FFMpegWriter report it later
+
+    for codec, extra_args in HARDWARE_ENCODERS:
+        if codec not in encoders:
+            continue
+        # An encoder can be built into ffmpeg without the hardware being present, so try a tiny encode first
+        test = subprocess.run([ffmpeg, '-hide_banner', '-loglevel', 'error', '-f', 'lavfi', '-i', 'color=size=256x256:duration=0.1',
+                               '-c:v', codec, '-f', 'null', '-'], capture_output=True)
+        if test.returncode == 0:
+            return codec, extra_args + ['-pix_fmt', 'yuv420p']
+
+    if 'libx264' in encoders:
+        return 'libx264', ['-preset', 'ultrafast', '-pix_fmt', 'yuv420p']
+    return 'h264', None  # Let ffmpeg pick its default H.264 encoder
+
+# Rough peak memory needed to process one dataset (edge arrays, layout and the figure)
+def estimate_memory(file_path):
+    num_nodes, _, num_entries, _, _, _ = mminfo(file_path)  # Only reads the file header
+    memory = num_entries * 64 + num_nodes * 64 + 200 * 2**20
+    if num_nodes <= KAMADA_KAWAI_MAX_NODES:
+        memory += num_nodes * num_nodes * 8  # Kamada-Kawai keeps an N x N matrix of distances
+    return memory
+
+# Function to process one dataset (kept at the top level so worker processes can run it)
+def process_file(index, file_path, num_trials, max_frames, use_cache, encoder):
+    output_video = f"{index+1}_dataset_karger.mp4"
+    print(f"Processing {file_path}...")
+    computational_cost = create_mst_video(file_path, output_video, num_trials, max_frames, use_cache, *encoder)
+    print(f"Empirical Computational Cost for {file_path}: {computational_cost}")
+    return computational_cost
+
+# Main function to handle multiple datasets (each dataset runs in its own process)
+def process_multiple_files(file_paths, num_trials=None, max_frames=MAX_FRAMES, use_cache=True):
+    max_workers = min(len(file_paths), os.cpu_count() or 1)
+    encoder = best_ffmpeg_encoder()  # Probed once and shared by all datasets
+
+    # Warn if the datasets running at the same time may not fit in memory
+    try:
+        total_memory = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError):
+        total_memory = None  # Not available on this system
+    needed_memory = sum(sorted((estimate_memory(file_path) for file_path in file_paths), reverse=True)[:max_workers])
+    if total_memory is not None and needed_memory > total_memory:
+        print(f"Warning: processing {max_workers} datasets at once may need about {needed_memory / 2**30:.1f} GB "
+              f"but only {total_memory / 2**30:.1f} GB of RAM is available")
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(process_file, range(len(file_paths)), file_paths, repeat(num_trials), repeat(max_frames), repeat(use_cache), repeat(encoder)))
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Karger's minimum cut on the selected networks")
+    parser.add_argument("--num-trials", type=int, default=None,
+                        help="number of independent Karger trials per dataset (default: based on the number of edges)")
+    parser.add_argument("--no-cache", action="store_true", help="recompute the node layouts instead of reusing cached ones")
+    args = parser.parse_args()
+
     file_paths = [
         "USAir97.mtx",
         "G13.mtx",
@@ -123,4 +337,4 @@ if __name__ == "__main__":
         "lhr04c.mtx",
         "amazon0302.mtx"
     ]
-    process_multiple_files(file_paths)
+    process_multiple_files(file_paths, args.num_trials, use_cache=not args.no_cache)
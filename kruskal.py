@@ -1,23 +1,61 @@
 import networkx as nx  # used to create and manipulate graphs/networks.
+import matplotlib  # used to pick a drawing backend that works without a display (in worker processes).
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt  # used for plotting graphs and visualizing results.
-from matplotlib.animation import FFMpegWriter  # Enables saving animations as .mp4 videos.
+from matplotlib.collections import LineCollection  # Draws many edges with a single call.
 import time  # used to measure execution time.
 from tqdm import tqdm  # used to show a progress bar
-from scipy.io import mmread  # mmread reads Matrix Market (.mtx) files (used for graph input).
+from scipy.io import mmread, mminfo  # mmread reads Matrix Market (.mtx) files (used for graph input), mminfo reads just their header.
 import numpy as np  # used for numerical operations, such as log2 and matrix conversions.
+import subprocess  # used to stream the frames to FFmpeg.
+import hashlib  # used to fingerprint input files for the graph and layout caches.
+import os  # used for file paths and folders, and to count the CPUs and read the machine's memory size.
+from itertools import repeat  # used to pass the same options to every dataset.
+import argparse  # used to read the command line options.
+from concurrent.futures import ProcessPoolExecutor  # used to process the datasets in parallel.
+import array  # used for compact integer arrays in the DSU.
+try:
+    from numba import njit  # used to compile the Kruskal loop to machine code.
+    NUMBA_AVAILABLE = True
+except ImportError:  # Without Numba the DSU class below is used instead
+    NUMBA_AVAILABLE = False
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]  # Used as @njit
+        return lambda func: func  # Used as @njit(...)
+
+# Most frames rendered per video, larger runs are sampled evenly (the last frame always shows the full result)
+MAX_FRAMES = 300
+
+# Largest graph (in nodes) that gets a video, bigger graphs only run the algorithm
+RENDER_MAX_NODES = 5000
+
+# Largest graph laid out with Kamada-Kawai (it needs an N x N distance matrix), bigger graphs get a random layout
+KAMADA_KAWAI_MAX_NODES = 2000
+
+# Folder where computed node layouts are kept between runs
+LAYOUT_CACHE_DIR = ".layout_cache"
+
+# Folder where parsed graphs are kept between runs
+GRAPH_CACHE_DIR = ".graph_cache"
+
+# Types the compiled kernels are built for: node ids are int32, weights are int32, float32 or float64 (see load_graph)
+WEIGHT_TYPES = ['int32', 'float32', 'float64']
 
 # DSU (Disjoint Set Union) class for cycle detection in Kruskal's Algorithm
 class DSU:
     def __init__(self, n):
-        self.parent = list(range(n))  # Each node starts as its own parent (not connected to anyone)
-        self.rank = [0] * n  # Rank keeps track of tree height (used to keep trees short)
+        # Both are compact 4-byte int arrays, filled from NumPy buffers instead of n Python ints
+        self.parent = array.array('i', np.arange(n, dtype=np.int32).tobytes())  # Each node starts as its own parent (not connected to anyone)
+        self.size = array.array('i', np.ones(n, dtype=np.int32).tobytes())  # Size keeps track of how many nodes are in each set (used to keep trees short)
 
     def find(self, x):
         # This function finds the root of the set that x belongs to
-        # If x is not its own parent, keep moving up to find the root
-        if self.parent[x] != x:
-            self.parent[x] = self.find(self.parent[x])  # Path compression: make x point directly to root
-        return self.parent[x]  # Return the root
+        parent = self.parent
+        while parent[x] != x:  # Keep moving up until we reach the root
+            parent[x] = parent[parent[x]]  # Path halving: point x to its grandparent on the way up
+            x = parent[x]
+        return x  # Return the root
 
     def union(self, x, y):
         # This function joins the sets that x and y belong to
@@ -25,132 +63,331 @@ class DSU:
         rootY = self.find(y)  # Find the root of y
 
         if rootX != rootY: # Only join them if they are in different sets
-            # Attach the shorter tree to the taller one (union by rank)
-            if self.rank[rootX] > self.rank[rootY]:
-                self.parent[rootY] = rootX  # Make rootX the parent
-            elif self.rank[rootX] < self.rank[rootY]:
-                self.parent[rootX] = rootY  # Make rootY the parent
-            else:
-                self.parent[rootY] = rootX  # Pick one as parent if ranks are equal
-                self.rank[rootX] += 1  # Increase the rank (height) of the new root
+            size = self.size
+            # Attach the smaller tree to the larger one (union by size)
+            if size[rootX] < size[rootY]:
+                rootX, rootY = rootY, rootX
+            self.parent[rootY] = rootX  # Make rootX the parent
+            size[rootX] += size[rootY]  # rootX's set now also holds rootY's nodes
             return True  # Successfully joined two different sets (no cycle)
         return False  # They were already connected (would create a cycle)
 
+# Union-Find: find the root of x's component (with path halving)
+@njit(cache=True)
+def _find(parent, x):
+    while parent[x] != x:  # Walk up until we reach the root
+        parent[x] = parent[parent[x]]  # Point x to its grandparent on the way up
+        x = parent[x]
+    return x
+
+# Compiled Kruskal loop: goes through the edges in the given order and keeps the ones joining two components
+@njit([f'(int64[::1], int32[::1], int32[::1], {t}[::1], int64)' for t in WEIGHT_TYPES], cache=True, boundscheck=False)
+def _kruskal(order, u, v, w, N):
+    parent = np.arange(N, dtype=np.int32)  # Union-Find: each node starts as its own parent
+    size = np.ones(N, dtype=np.int32)  # Union-Find: number of nodes in each component
+    mst_idx = np.empty(max(N - 1, 0), np.int64)  # Indices of the edges added to the MST
+    num_mst = 0  # Number of MST edges found so far
+    total_weight = 0.0  # Total weight of MST
+
+    for k in range(len(order)):  # Check all edges, lightest first
+        i = order[k]
+        root_u = _find(parent, u[i])  # Component of u
+        root_v = _find(parent, v[i])  # Component of v
+        if root_u != root_v:  # Only join them if they are in different components (no cycle)
+            if size[root_u] < size[root_v]:  # Attach the smaller tree to the larger one (union by size)
+                root_u, root_v = root_v, root_u
+            parent[root_v] = root_u
+            size[root_u] += size[root_v]
+            mst_idx[num_mst] = i  # Add edge to the MST
+            num_mst += 1
+            total_weight += w[i]
+            if num_mst == N - 1:  # The tree is complete
+                break
+
+    return mst_idx[:num_mst], total_weight
+
+# Order of the edges by weight (smallest first, equal weights keep their order), the same as np.argsort(w, kind='stable')
+# 32-bit weights are turned into exact unsigned integer keys and sorted with 16-bit passes, which NumPy does with radix sort
+def weight_order(w):
+    if w.dtype == np.float64 or len(w) == 0:
+        return np.argsort(w, kind='stable')  # No exact 32-bit key for float64 weights
+    if w.dtype == np.float32:
+        bits = (w + np.float32(0)).view(np.uint32)  # Adding 0 turns -0.0 into 0.0 so they stay equal
+        key = np.where(bits >> 31, ~bits, bits | np.uint32(0x80000000))  # Unsigned integer order now matches float order
+    else:
+        low, high = int(w.min()), int(w.max())
+        if low == high:
+            return np.arange(len(w))  # All weights are equal (e.g. unit weights), the edges keep their order
+        if high - low < 2**16:
+            return np.argsort((w - low).astype(np.uint16), kind='stable')  # Small range, a single 16-bit pass is enough
+        key = (w.astype(np.int64) - low).astype(np.uint32)  # Shift integer weights to start at 0
+    order = np.argsort(key.astype(np.uint16), kind='stable')  # Sort by the low 16 bits first
+    high_bits = (key >> 16).astype(np.uint16)
+    if high_bits.any():
+        order = order[np.argsort(high_bits[order], kind='stable')]  # then by the high 16 bits (stable, so ties keep the low order)
+    return order
 
 # Kruskal's Algorithm to find MST
+# G is either a NetworkX graph or a (u, v, w) triple of edge arrays (edge i goes from u[i] to v[i] with weight w[i])
 def kruskal_mst(G):
-    edges = list(G.edges(data=True))  # Get all edges from the graph, including their weights
+    if isinstance(G, nx.Graph):
+        # Pull the edges out of the graph into NumPy arrays
+        num_edges = G.number_of_edges()
+        u_arr = np.fromiter((u for u, _, _ in G.edges(data='weight')), dtype=np.int32, count=num_edges)
+        v_arr = np.fromiter((v for _, v, _ in G.edges(data='weight')), dtype=np.int32, count=num_edges)
+        w_arr = np.fromiter((w for _, _, w in G.edges(data='weight')), dtype=np.float64, count=num_edges)
+        num_nodes = len(G.nodes)
+    else:
+        u_arr, v_arr, w_arr = G  # The edge arrays are given directly, no NetworkX graph needed
+        # Bring them to the types the compiled loop is built for (int32 node ids, int32/float32/float64 weights)
+        u_arr = np.ascontiguousarray(u_arr, dtype=np.int32)
+        v_arr = np.ascontiguousarray(v_arr, dtype=np.int32)
+        w_arr = np.ascontiguousarray(w_arr)
+        if w_arr.dtype.name not in WEIGHT_TYPES:
+            fits_int32 = np.issubdtype(w_arr.dtype, np.integer) and np.abs(w_arr).max(initial=0) < 2**31
+            w_arr = w_arr.astype(np.int32 if fits_int32 else np.float64)  # Other integer types and floats are widened or narrowed exactly
+        num_nodes = int(max(u_arr.max(initial=-1), v_arr.max(initial=-1))) + 1
+
+    order = weight_order(w_arr)  # Order of the edges by weight (smallest first)
 
-    edges.sort(key=lambda x: x[2]['weight'])  # Sort edges by weight (smallest first)
+    if NUMBA_AVAILABLE:
+        # Run the selection loop in compiled code and map the chosen edges back
+        mst_idx, total_weight = _kruskal(order, u_arr, v_arr, w_arr, num_nodes)
+        mst = list(zip(u_arr[mst_idx].tolist(), v_arr[mst_idx].tolist(), w_arr[mst_idx].tolist()))
+        return mst, total_weight  # Return the list of MST edges and the total weight
 
-    dsu = DSU(len(G.nodes))  # Create a DSU object to track connected nodes (for cycle checking)
+    dsu = DSU(num_nodes)  # Create a DSU object to track connected nodes (for cycle checking)
     mst = []  # This will store the final MST edges
     total_weight = 0  # This will keep track of the total weight of the MST
 
     # Loop through each edge, starting from the smallest weight
-    for u, v, weight in edges:
+    for u, v, weight in zip(u_arr[order].tolist(), v_arr[order].tolist(), w_arr[order].tolist()):
         if dsu.union(u, v):  # Try to add the edge; if it doesn’t form a cycle
-            mst.append((u, v, weight['weight']))  # Add edge to the MST
-            total_weight += weight['weight']  # Add its weight to the total
+            mst.append((u, v, weight))  # Add edge to the MST
+            total_weight += weight  # Add its weight to the total
 
     return mst, total_weight  # Return the list of MST edges and the total weight
 
-# Function to load the graph from a file
-def load_graph(file_path):
-    # Load the graph data from a .mtx file
-    data = mmread(file_path).toarray()  # Turns the matrix into a 2D NumPy array
-    G = nx.from_numpy_array(data)  # Convert to NetworkX graph (from numpy array)
+# Function to load the graph from a file, the parsed edge arrays are cached on disk (shared by kruskal.py and prim.py)
+def load_graph(file_path, use_cache=True):
+    with open(file_path, 'rb') as f:
+        key = hashlib.md5(f.read()).hexdigest()  # Changes whenever the file contents change
+    cache_path = os.path.join(GRAPH_CACHE_DIR, f"{key}.npz")
 
-    # Loop through all edges in the graph
-    for u, v, data in G.edges(data=True):
-        # If any edge has a negative weight
-        if data['weight'] < 0:
-            data['weight'] += 1.5  # Adjust negative weight to positive + 1.5
-            
-    return G # Return the final graph
+    if use_cache and os.path.exists(cache_path):
+        with np.load(cache_path) as cached:  # Reuse the edge arrays from an earlier run, skipping mmread
+            return cached['u'], cached['v'], cached['w'], int(cached['N'])
+
+    # Load the graph data from a .mtx file as a sparse matrix (only the non-zero entries are stored)
+    coo = mmread(file_path).tocoo()
+    coo.sum_duplicates()  # Repeated entries add up, like in the dense matrix
+    nonzero = coo.data != 0  # Zero entries are not edges
+    row, col, data = coo.row[nonzero], coo.col[nonzero], coo.data[nonzero]
+
+    # Keep every undirected edge once (symmetric files store each edge as both (i, j) and (j, i)).
+    # When both are stored, the lower-triangle value wins, the same as when building the graph with NetworkX.
+    first_end = np.minimum(row, col)
+    second_end = np.maximum(row, col)
+    order = np.lexsort((row < col, second_end, first_end))  # Group the copies of each edge, lower-triangle copy first
+    first_copy = np.ones(len(order), dtype=bool)
+    first_copy[1:] = (first_end[order][1:] != first_end[order][:-1]) | (second_end[order][1:] != second_end[order][:-1])
+    edges = order[first_copy]
+
+    # Edge i goes from u[i] to v[i] with weight w[i]
+    u = first_end[edges].astype(np.int32)
+    v = second_end[edges].astype(np.int32)
+    w = data[edges].astype(np.float64)
+    np.add(w, 1.5, out=w, where=w < 0)  # Adjust negative weights to positive + 1.5 (in place, one pass)
+
+    # Store the weights in 4 bytes where that stays exact enough (halves the memory read by the edge loops)
+    max_weight = np.abs(w).max(initial=0)
+    if np.all(w == np.floor(w)) and max_weight < 2**31:
+        w = w.astype(np.int32)  # Integer weights (e.g. unit weights) are kept as integers
+    elif max_weight < 2**24:
+        w = w.astype(np.float32)  # Larger values keep float64 so big weights are not rounded
+
+    N = coo.shape[0]  # Number of nodes
+    if use_cache:
+        os.makedirs(GRAPH_CACHE_DIR, exist_ok=True)
+        temp_path = f"{cache_path}.{os.getpid()}.npz"  # Written under a temporary name so a parallel run never reads half a file
+        np.savez(temp_path, u=u, v=v, w=w, N=N)
+        os.replace(temp_path, cache_path)
+    return u, v, w, N  # Return the edge arrays and the number of nodes
+
+# Function to lay out the nodes, cached on disk per input file so reruns skip the layout
+def compute_layout(file_path, u, v, w, N, use_cache=True):
+    with open(file_path, 'rb') as f:
+        key = hashlib.md5(f.read()).hexdigest()  # Changes whenever the file contents change
+    cache_path = os.path.join(LAYOUT_CACHE_DIR, f"kruskal_{key}.npy")
+
+    if use_cache and os.path.exists(cache_path):
+        return np.load(cache_path)  # Reuse the layout from an earlier run
+
+    # Build a NetworkX graph from the edge arrays, it is only used for the drawing
+    G = nx.Graph()
+    G.add_nodes_from(range(N))
+    if N <= KAMADA_KAWAI_MAX_NODES:
+        G.add_weighted_edges_from(zip(u.tolist(), v.tolist(), w.tolist()))
+        pos = nx.kamada_kawai_layout(G)  # Layout for nodes
+    else:
+        pos = nx.random_layout(G, seed=0)  # Kamada-Kawai is far too slow and memory hungry at this size
+    pos = np.array([pos[i] for i in range(N)])  # Row i is the position of node i
+
+    if use_cache:
+        os.makedirs(LAYOUT_CACHE_DIR, exist_ok=True)
+        np.save(cache_path, pos)
+    return pos
 
 # Main function for animation and video creation
-def create_mst_video(file_path, output_video="kruskal_mst_video.mp4"):
+def create_mst_video(file_path, output_video="kruskal_mst_video.mp4", max_frames=MAX_FRAMES, use_cache=True, fig=None, ax=None):
     # Load graph from file
-    G = load_graph(file_path)
-    print(f"Loaded graph with {len(G.nodes)} nodes and {len(G.edges)} edges")
+    u, v, w, N = load_graph(file_path, use_cache)
+    print(f"Loaded graph with {N} nodes and {len(u)} edges")
 
     # Start timer for the algorithm execution time
-    start_time_algorithm = time.time()
+    start_time_algorithm = time.perf_counter_ns()  # Monotonic clock with nanosecond resolution
     
     # Run Kruskal's Algorithm to find the MST
-    mst, mst_weight = kruskal_mst(G)
+    mst, mst_weight = kruskal_mst((u, v, w))
 
     # Stop timer for the algorithm execution time
-    end_time_algorithm = time.time()
+    end_time_algorithm = time.perf_counter_ns()
 
     # Calculate the algorithm execution time
-    algorithm_execution_time = end_time_algorithm - start_time_algorithm
+    algorithm_execution_time = (end_time_algorithm - start_time_algorithm) / 1e9  # In seconds
     print(f"Algorithm execution time: {algorithm_execution_time:.6f} seconds")
 
     print(f"MST has {len(mst)} edges with total weight: {mst_weight}")
     
-    # Prepare the figure and axes for animation
-    fig, ax = plt.subplots(figsize=(12, 12))
-    ax.axis('off')
-    pos = nx.kamada_kawai_layout(G)  # Layout for nodes
-    
     # Calculate the computational cost (empirical complexity)
-    computational_cost = len(G.edges) * np.log2(len(G.edges)) # O(E log E)
+    computational_cost = len(u) * np.log2(len(u)) # O(E log E)
     print(f"Computational cost (empirical complexity): {computational_cost}")
     
-    # Function to update the animation frame
-    def update(frame, computational_cost, algorithm_execution_time):
-        ax.clear()
-        ax.axis('off')
-        ax.set_title(f"Kruskal's Algorithm: Step {frame + 1}/{len(mst)}", fontsize=16)
-        
-        # Draw nodes
-        nx.draw_networkx_nodes(G, pos, ax=ax, node_size=8, node_color='#B0B0B0')
-        
-        # Draw MST edges added so far in a darker blue
-        for i in range(frame + 1):
-            u, v, weight = mst[i]
-            color = '#3D5C7E'
-            nx.draw_networkx_edges(G, pos, edgelist=[(u, v)], edge_color=color, width=2, ax=ax)
-        
-        # Draw remaining edges in red
-        remaining_edges = mst[frame + 1:]
-        for u, v, weight in remaining_edges:
-            color = 'red'
-            nx.draw_networkx_edges(G, pos, edgelist=[(u, v)], edge_color=color, width=0.5, ax=ax)
-        
-        # Add live execution time and MST cost, along with computational cost on the left of the graph
-        ax.text(-0.1, 0.9, f"Total MST Cost: {mst_weight:.2f}", transform=ax.transAxes, ha="left", va="top", fontsize=12)
-        ax.text(-0.1, 0.85, f"Algorithm Execution Time: {algorithm_execution_time:.6f} sec", transform=ax.transAxes, ha="left", va="top", fontsize=12)
-        ax.text(-0.1, 0.8, f"Computational Cost: {computational_cost:.2f}", transform=ax.transAxes, ha="left", va="top", fontsize=12)
-    
-    # Initialize the video writer using FFmpeg
-    writer = FFMpegWriter(fps=30)
+    # Large graphs take far longer to draw than to solve and are unreadable as a video, so only the algorithm is run
+    if N > RENDER_MAX_NODES:
+        print(f"Skipping the video for {file_path}: {N} nodes is more than {RENDER_MAX_NODES}")
+        return computational_cost
+
+    # Prepare the figure and axes for animation (a figure passed in is reused and only its axes are cleared afterwards)
+    own_figure = fig is None
+    if own_figure:
+        fig, ax = plt.subplots(figsize=(12, 12))
+    ax.axis('off')
+
+    xy = compute_layout(file_path, u, v, w, N, use_cache)  # Node positions (row i is the position of node i)
     
+    # The two end points of every MST edge
+    mst_u = np.array([a for a, _, _ in mst], dtype=np.int64)
+    mst_v = np.array([b for _, b, _ in mst], dtype=np.int64)
+    segments = np.stack((xy[mst_u], xy[mst_v]), axis=1)  # One (start, end) segment per MST edge
+
+    # Draw everything that does not change between frames once
+    nodes = ax.scatter(xy[:, 0], xy[:, 1], s=8, c='#B0B0B0', zorder=2)  # Nodes
+    ax.add_collection(LineCollection(segments, colors='red', linewidths=0.5, zorder=1))  # All MST edges start red and thin
+    new_lines = LineCollection([], colors='#3D5C7E', linewidths=2, zorder=1, animated=True)  # MST edges added since the last frame
+    ax.add_collection(new_lines)
+    title = ax.set_title("", fontsize=16)
+
+    # Add live execution time and MST cost, along with computational cost on the left of the graph
+    texts = [
+        title,
+        ax.text(-0.1, 0.9, f"Total MST Cost: {mst_weight:.2f}", transform=ax.transAxes, ha="left", va="top", fontsize=12),
+        ax.text(-0.1, 0.85, f"Algorithm Execution Time: {algorithm_execution_time:.6f} sec", transform=ax.transAxes, ha="left", va="top", fontsize=12),
+        ax.text(-0.1, 0.8, f"Computational Cost: {computational_cost:.2f}", transform=ax.transAxes, ha="left", va="top", fontsize=12),
+    ]
+    for text in texts:
+        text.set_animated(True)  # Drawn over the edges each frame, so they are left out of the background
+
+    # Render the static figure once, every frame is then drawn on top of the previous one (blitting)
+    fig.canvas.draw()
+    background = fig.canvas.copy_from_bbox(fig.bbox)
+    drawn = 0  # Number of MST edges already drawn in blue on the background
+
+    # Function to update the animation frame (only the newly added edges and the text are drawn)
+    def update(frame):
+        nonlocal background, drawn
+        fig.canvas.restore_region(background)
+        new_lines.set_segments(segments[drawn:frame + 1])  # Draw MST edges added so far in a darker blue
+        ax.draw_artist(new_lines)
+        ax.draw_artist(nodes)  # Keep the nodes on top of the new edges
+        background = fig.canvas.copy_from_bbox(fig.bbox)  # The next frame starts from this one
+        drawn = frame + 1
+        title.set_text(f"Kruskal's Algorithm: Step {frame + 1}/{len(mst)}")
+        for text in texts:
+            ax.draw_artist(text)
+
     total_frames = len(mst)
-    
+    step = max(1, -(-total_frames // max_frames))  # Render every step-th frame (rounded up to stay within max_frames)
+    frames = list(range(0, total_frames, step))
+    if frames and frames[-1] != total_frames - 1:
+        frames.append(total_frames - 1)  # Always finish on the complete result
+
+    # Start FFmpeg reading raw RGBA frames, the canvas pixels are written to it directly (FFMpegWriter would redraw the whole figure)
+    width, height = fig.canvas.get_width_height()
+    ffmpeg = subprocess.Popen([matplotlib.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error',
+                               '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{width}x{height}', '-r', '30', '-i', 'pipe:',
+                               '-vcodec', 'h264', '-pix_fmt', 'yuv420p', output_video], stdin=subprocess.PIPE)
+
     # Create the animation with a progress bar
-    with tqdm(total=total_frames, desc="Rendering frames", ncols=100, unit="frame") as pbar:
-        with writer.saving(fig, output_video, dpi=100):
-            for i in range(total_frames):
-                update(i, computational_cost, algorithm_execution_time)
-                writer.grab_frame()
-                pbar.update(1)
+    with tqdm(total=len(frames), desc="Rendering frames", ncols=100, unit="frame") as pbar:
+        for i in frames:
+            update(i)
+            ffmpeg.stdin.write(fig.canvas.buffer_rgba())
+            pbar.update(1)
+    ffmpeg.stdin.close()
+    if ffmpeg.wait() != 0:
+        raise RuntimeError(f"FFmpeg failed to write '{output_video}'")
+    if own_figure:
+        plt.close(fig)
+    else:
+        ax.cla()  # Leave the reused figure empty for the next dataset
     
     print(f"Video saved as '{output_video}'")
 
     return computational_cost
 
-# Main function to handle multiple datasets
-def process_multiple_files(file_paths):
-    for index, file_path in enumerate(file_paths):
-        output_video = f"{index+1}_dataset_kruskal.mp4"
-        print(f"Processing {file_path}...")
-        computational_cost = create_mst_video(file_path, output_video)
-        print(f"Empirical Computational Cost for {file_path}: {computational_cost}")
+# Rough peak memory needed to process one dataset (edge arrays, layout and the figure)
+def estimate_memory(file_path):
+    num_nodes, _, num_entries, _, _, _ = mminfo(file_path)  # Only reads the file header
+    return num_entries * 64 + num_nodes * 64 + 200 * 2**20
+
+# Figure and axes reused for every dataset a worker process renders (created on first use)
+worker_figure = None
+
+# Function to process one dataset (kept at the top level so worker processes can run it)
+def process_file(index, file_path, max_frames, use_cache):
+    global worker_figure
+    if worker_figure is None:
+        worker_figure = plt.subplots(figsize=(12, 12))
+    fig, ax = worker_figure
+    output_video = f"{index+1}_dataset_kruskal.mp4"
+    print(f"Processing {file_path}...")
+    computational_cost = create_mst_video(file_path, output_video, max_frames, use_cache, fig, ax)
+    print(f"Empirical Computational Cost for {file_path}: {computational_cost}")
+    return computational_cost
+
+# Main function to handle multiple datasets (each dataset runs in its own process)
+def process_multiple_files(file_paths, max_frames=MAX_FRAMES, use_cache=True):
+    max_workers = min(len(file_paths), os.cpu_count() or 1)
+
+    # Warn if the datasets running at the same time may not fit in memory
+    try:
+        total_memory = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError):
+        total_memory = None  # Not available on this system
+    needed_memory = sum(sorted((estimate_memory(file_path) for file_path in file_paths), reverse=True)[:max_workers])
+    if total_memory is not None and needed_memory > total_memory:
+        print(f"Warning: processing {max_workers} datasets at once may need about {needed_memory / 2**30:.1f} GB "
+              f"but only {total_memory / 2**30:.1f} GB of RAM is available")
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(process_file, range(len(file_paths)), file_paths, repeat(max_frames), repeat(use_cache)))
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kruskal's MST on the selected networks")
+    parser.add_argument("--no-cache", action="store_true", help="reparse the graphs and recompute the node layouts instead of reusing cached ones")
+    args = parser.parse_args()
+
     file_paths = [
         "USAir97.mtx",
         "G13.mtx",
@@ -158,4 +395,4 @@ if __name__ == "__main__":
         "lhr04c.mtx",
         "amazon0302.mtx"
     ]
-    process_multiple_files(file_paths)
+    process_multiple_files(file_paths, use_cache=not args.no_cache)
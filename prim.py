@@ -1,144 +1,325 @@
 import networkx as nx  # used to create and manipulate graphs/networks.
+import matplotlib  # used to pick a drawing backend that works without a display (in worker processes).
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt  # used for plotting graphs and visualizing results.
-from matplotlib.animation import FFMpegWriter  # Enables saving animations as .mp4 videos.
+from matplotlib.collections import LineCollection  # Draws many edges with a single call.
 import time  # used to measure execution time.
 from tqdm import tqdm  # used to show a progress bar
-from scipy.io import mmread  # mmread reads Matrix Market (.mtx) files (used for graph input).
+from scipy.io import mmread, mminfo  # mmread reads Matrix Market (.mtx) files (used for graph input), mminfo reads just their header.
 import numpy as np  # used for numerical operations, such as log2 and matrix conversions.
+import subprocess  # used to stream the frames to FFmpeg.
+import hashlib  # used to fingerprint input files for the graph and layout caches.
+import os  # used for file paths and folders, and to count the CPUs and read the machine's memory size.
+from itertools import repeat  # used to pass the same options to every dataset.
+import argparse  # used to read the command line options.
+from concurrent.futures import ProcessPoolExecutor  # used to process the datasets in parallel.
 import heapq  # For the priority queue
+from scipy.sparse import coo_matrix  # used to build the sparse adjacency matrix for SciPy.
+from scipy.sparse.csgraph import minimum_spanning_tree  # C implementation of the MST.
 
-# Prim's Algorithm to find MST
-def prim_mst(G):
-    start_node = 0  # Start building the MST from node 0
-    visited = set([start_node])  # Keep track of nodes that are already in the MST
-    mst = []  # List to store the edges of the MST
-    total_weight = 0  # Total weight of all MST edges
-    edges = []  # Priority queue (min-heap) for available edges
-    seen_edges = set()  # Track edges we've already looked at (to avoid duplicates)
+# Most frames rendered per video, larger runs are sampled evenly (the last frame always shows the full result)
+MAX_FRAMES = 300
+
+# Largest graph (in nodes) that gets a video, bigger graphs only run the algorithm
+RENDER_MAX_NODES = 5000
+
+# Largest graph laid out with Kamada-Kawai (it needs an N x N distance matrix), bigger graphs get a random layout
+KAMADA_KAWAI_MAX_NODES = 2000
+
+# Folder where computed node layouts are kept between runs
+LAYOUT_CACHE_DIR = ".layout_cache"
+
+# Folder where parsed graphs are kept between runs
+GRAPH_CACHE_DIR = ".graph_cache"
 
-    # Add all edges from the start node to the heap
-    for v, edge_data in G[start_node].items():
-        edge = tuple(sorted((start_node, v)))  # Represent the edge as a sorted tuple
-        if edge not in seen_edges:
-            seen_edges.add(edge)  # Mark this edge as seen
-            heapq.heappush(edges, (edge_data['weight'], start_node, v))  # Add edge to the heap
+# Prim's loop: grow a tree from start_node with a min-heap of the edges leaving it, appending each edge to mst in the order
+# Prim adds it (node u's neighbors are indices[indptr[u]:indptr[u+1]]), returns the number of nodes added and their total weight
+def grow_tree(start_node, indptr, indices, data, visited, mst, num_visited):
+    num_nodes = len(visited)
+    visited[start_node] = 1  # The start node is in the tree
+    num_added = 1  # Number of nodes added to the tree
+    total_weight = 0  # Total weight of the edges added
+
+    # Priority queue (min-heap) of the edges leaving the start node, built in one go
+    edges = [(data[j], start_node, indices[j]) for j in range(indptr[start_node], indptr[start_node + 1])]
+    heapq.heapify(edges)
+    heappush, heappop = heapq.heappush, heapq.heappop  # Local names are faster to look up in the loop
 
     # Keep going until we visit all nodes or run out of edges
-    while edges and len(visited) < G.number_of_nodes():
-        weight, u, v = heapq.heappop(edges)  # Get the edge with the smallest weight
-        if v in visited:
+    while edges and num_visited + num_added < num_nodes:
+        weight, u, v = heappop(edges)  # Get the edge with the smallest weight
+        if visited[v]:
             continue  # Skip if the destination node is already visited
 
-        visited.add(v)  # Mark the new node as visited
+        visited[v] = 1  # Mark the new node as visited
+        num_added += 1
         mst.append((u, v, weight))  # Add this edge to the MST
         total_weight += weight  # Add the weight to the total
 
         # Look at all edges from the new node
-        for u, edge_data in G[v].items():
-            if u not in visited:  # Only consider edges going to unvisited nodes
-                edge = tuple(sorted((v, u)))  # Sort to avoid duplicates
-                if edge not in seen_edges:
-                    seen_edges.add(edge)  # Mark this edge as seen
-                    heapq.heappush(edges, (edge_data['weight'], v, u))  # Add edge to the heap
+        for j in range(indptr[v], indptr[v + 1]):
+            u = indices[j]
+            if not visited[u]:  # Only consider edges going to unvisited nodes (stale ones are skipped when popped)
+                heappush(edges, (data[j], v, u))  # Add edge to the heap
+
+    return num_added, total_weight
+
+# Prim's Algorithm to find MST
+def prim_mst(u_arr, v_arr, w_arr, num_nodes, use_scipy=True):
+    if use_scipy:
+        # Let SciPy compute the MST (compiled code), then replay Prim's loop over just its N-1 edges to get the order Prim adds them in
+        # SciPy treats zero entries as missing edges, so zero weights are passed as the smallest positive float
+        tiny = np.finfo(np.float64).tiny
+        weights = np.where(w_arr == 0, tiny, w_arr).astype(np.float64)
+        T = minimum_spanning_tree(coo_matrix((weights, (u_arr, v_arr)), shape=(num_nodes, num_nodes)).tocsr()).tocoo()
+        u_arr, v_arr, w_arr = T.row, T.col, T.data
+        w_arr[w_arr == tiny] = 0
+
+    # CSR adjacency matrix with both directions of every edge (node u's neighbors are indices[indptr[u]:indptr[u+1]])
+    rows = np.concatenate((u_arr, v_arr))
+    cols = np.concatenate((v_arr, u_arr))
+    order = np.argsort(rows, kind='stable')  # Group the edges by their first node
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_nodes), out=indptr[1:])
+    indptr = indptr.tolist()  # Where each node's neighbors start and end
+    indices = cols[order].tolist()  # Neighbor of every stored edge
+    data = np.concatenate((w_arr, w_arr))[order].tolist()  # Weight of every stored edge
+
+    visited = bytearray(num_nodes)  # Keep track of nodes that are already in the MST (1 if visited)
+    mst = []  # List to store the edges of the MST
+    num_visited, total_weight = grow_tree(0, indptr, indices, data, visited, mst, 0)  # Start building the MST from node 0
+
+    if use_scipy:
+        # SciPy's tree also spans the parts of the graph node 0 cannot reach, grow each of them from its lowest node
+        for start_node in np.flatnonzero(np.diff(indptr)).tolist():
+            if not visited[start_node]:
+                num_added, weight = grow_tree(start_node, indptr, indices, data, visited, mst, num_visited)
+                num_visited += num_added
+                total_weight += weight
+        total_weight = float(total_weight)
 
     return mst, total_weight  # Return the MST edges and the total weight
 
-# Function to load the graph from a file
-def load_graph(file_path):
-    # Load the graph data from a .mtx file
-    data = mmread(file_path).toarray()  # Turns the matrix into a 2D NumPy array
-    G = nx.from_numpy_array(data)  # Convert to NetworkX graph (from numpy array)
+# Function to load the graph from a file, the parsed edge arrays are cached on disk (shared by kruskal.py and prim.py)
+def load_graph(file_path, use_cache=True):
+    with open(file_path, 'rb') as f:
+        key = hashlib.md5(f.read()).hexdigest()  # Changes whenever the file contents change
+    cache_path = os.path.join(GRAPH_CACHE_DIR, f"{key}.npz")
+
+    if use_cache and os.path.exists(cache_path):
+        with np.load(cache_path) as cached:  # Reuse the edge arrays from an earlier run, skipping mmread
+            return cached['u'], cached['v'], cached['w'], int(cached['N'])
+
+    # Load the graph data from a .mtx file as a sparse matrix (only the non-zero entries are stored)
+    coo = mmread(file_path).tocoo()
+    coo.sum_duplicates()  # Repeated entries add up, like in the dense matrix
+    nonzero = coo.data != 0  # Zero entries are not edges
+    row, col, data = coo.row[nonzero], coo.col[nonzero], coo.data[nonzero]
+
+    # Keep every undirected edge once (symmetric files store each edge as both (i, j) and (j, i)).
+    # When both are stored, the lower-triangle value wins, the same as when building the graph with NetworkX.
+    first_end = np.minimum(row, col)
+    second_end = np.maximum(row, col)
+    order = np.lexsort((row < col, second_end, first_end))  # Group the copies of each edge, lower-triangle copy first
+    first_copy = np.ones(len(order), dtype=bool)
+    first_copy[1:] = (first_end[order][1:] != first_end[order][:-1]) | (second_end[order][1:] != second_end[order][:-1])
+    edges = order[first_copy]
+
+    # Edge i goes from u[i] to v[i] with weight w[i]
+    u = first_end[edges].astype(np.int32)
+    v = second_end[edges].astype(np.int32)
+    w = data[edges].astype(np.float64)
+    np.add(w, 1.5, out=w, where=w < 0)  # Adjust negative weights to positive + 1.5 (in place, one pass)
+
+    # Store the weights in 4 bytes where that stays exact enough (halves the memory read by the edge loops)
+    max_weight = np.abs(w).max(initial=0)
+    if np.all(w == np.floor(w)) and max_weight < 2**31:
+        w = w.astype(np.int32)  # Integer weights (e.g. unit weights) are kept as integers
+    elif max_weight < 2**24:
+        w = w.astype(np.float32)  # Larger values keep float64 so big weights are not rounded
+
+    N = coo.shape[0]  # Number of nodes
+    if use_cache:
+        os.makedirs(GRAPH_CACHE_DIR, exist_ok=True)
+        temp_path = f"{cache_path}.{os.getpid()}.npz"  # Written under a temporary name so a parallel run never reads half a file
+        np.savez(temp_path, u=u, v=v, w=w, N=N)
+        os.replace(temp_path, cache_path)
+    return u, v, w, N  # Return the edge arrays and the number of nodes
+
+# Function to lay out the nodes, cached on disk per input file so reruns skip the layout
+def compute_layout(file_path, u, v, w, N, use_cache=True):
+    with open(file_path, 'rb') as f:
+        key = hashlib.md5(f.read()).hexdigest()  # Changes whenever the file contents change
+    cache_path = os.path.join(LAYOUT_CACHE_DIR, f"prim_{key}.npy")
+
+    if use_cache and os.path.exists(cache_path):
+        return np.load(cache_path)  # Reuse the layout from an earlier run
 
-    # Loop through all edges in the graph
-    for u, v, data in G.edges(data=True):
-        # If any edge has a negative weight
-        if data['weight'] < 0:
-            data['weight'] += 1.5  # Adjust negative weight to positive + 1.5
+    # Build a NetworkX graph from the edge arrays, it is only used for the drawing
+    G = nx.Graph()
+    G.add_nodes_from(range(N))
+    if N <= KAMADA_KAWAI_MAX_NODES:
+        G.add_weighted_edges_from(zip(u.tolist(), v.tolist(), w.tolist()))
+        pos = nx.kamada_kawai_layout(G)  # Layout for nodes
+    else:
+        pos = nx.random_layout(G, seed=0)  # Kamada-Kawai is far too slow and memory hungry at this size
+    pos = np.array([pos[i] for i in range(N)])  # Row i is the position of node i
 
-    return G # Return the final graph
+    if use_cache:
+        os.makedirs(LAYOUT_CACHE_DIR, exist_ok=True)
+        np.save(cache_path, pos)
+    return pos
 
 # Main function for animation and video creation
-def create_mst_video(file_path, output_video="prim_mst_video.mp4"):
+def create_mst_video(file_path, output_video="prim_mst_video.mp4", max_frames=MAX_FRAMES, use_cache=True, fig=None, ax=None):
     # Load graph from file
-    G = load_graph(file_path)
-    print(f"Loaded graph with {len(G.nodes)} nodes and {len(G.edges)} edges")
+    u, v, w, N = load_graph(file_path, use_cache)
+    print(f"Loaded graph with {N} nodes and {len(u)} edges")
 
     # Start timer for the algorithm execution time
-    start_time_algorithm = time.time()
+    start_time_algorithm = time.perf_counter_ns()  # Monotonic clock with nanosecond resolution
 
     # Run Prim's Algorithm to find the MST
-    mst, mst_weight = prim_mst(G)
+    mst, mst_weight = prim_mst(u, v, w, N)
 
     # Stop timer for the algorithm execution time
-    end_time_algorithm = time.time()
+    end_time_algorithm = time.perf_counter_ns()
 
     # Calculate the algorithm execution time
-    algorithm_execution_time = end_time_algorithm - start_time_algorithm
+    algorithm_execution_time = (end_time_algorithm - start_time_algorithm) / 1e9  # In seconds
     print(f"Algorithm execution time: {algorithm_execution_time:.6f} seconds")
 
     print(f"MST has {len(mst)} edges with total weight: {mst_weight}")
     
-    # Prepare the figure and axes for animation
-    fig, ax = plt.subplots(figsize=(12, 12))
-    ax.axis('off')
-    pos = nx.kamada_kawai_layout(G)  # Layout for nodes
-    
     # Calculate the computational cost (empirical complexity)
-    computational_cost = len(G.edges) * np.log2(len(G.nodes)) # O(E log V)
+    computational_cost = len(u) * np.log2(N) # O(E log V)
     print(f"Computational cost (empirical complexity): {computational_cost}")
     
-    # Function to update the animation frame
-    def update(frame, computational_cost, algorithm_execution_time):
-        ax.clear()
-        ax.axis('off')
-        ax.set_title(f"Prim's Algorithm: Step {frame + 1}/{len(mst)}", fontsize=16)
-        
-        # Draw nodes
-        nx.draw_networkx_nodes(G, pos, ax=ax, node_size=8, node_color='#B0B0B0')
-        
-        # Draw MST edges added so far in a darker blue
-        for i in range(frame + 1):
-            u, v, weight = mst[i]
-            color = '#3D5C7E'
-            nx.draw_networkx_edges(G, pos, edgelist=[(u, v)], edge_color=color, width=2, ax=ax)
-        
-        # Draw remaining edges in red
-        remaining_edges = mst[frame + 1:]
-        for u, v, weight in remaining_edges:
-            color = 'red'
-            nx.draw_networkx_edges(G, pos, edgelist=[(u, v)], edge_color=color, width=0.5, ax=ax)
-        
-        # Add live execution time and MST cost, along with computational cost on the left of the graph
-        ax.text(-0.1, 0.9, f"Total MST Cost: {mst_weight:.2f}", transform=ax.transAxes, ha="left", va="top", fontsize=12)
-        ax.text(-0.1, 0.85, f"Algorithm Execution Time: {algorithm_execution_time:.6f} sec", transform=ax.transAxes, ha="left", va="top", fontsize=12)
-        ax.text(-0.1, 0.8, f"Computational Cost: {computational_cost:.2f}", transform=ax.transAxes, ha="left", va="top", fontsize=12)
-    
-    # Initialize the video writer using FFmpeg
-    writer = FFMpegWriter(fps=30)
+    # Large graphs take far longer to draw than to solve and are unreadable as a video, so only the algorithm is run
+    if N > RENDER_MAX_NODES:
+        print(f"Skipping the video for {file_path}: {N} nodes is more than {RENDER_MAX_NODES}")
+        return computational_cost
+
+    # Prepare the figure and axes for animation (a figure passed in is reused and only its axes are cleared afterwards)
+    own_figure = fig is None
+    if own_figure:
+        fig, ax = plt.subplots(figsize=(12, 12))
+    ax.axis('off')
+
+    xy = compute_layout(file_path, u, v, w, N, use_cache)  # Node positions (row i is the position of node i)
     
+    # The two end points of every MST edge
+    mst_u = np.array([a for a, _, _ in mst], dtype=np.int64)
+    mst_v = np.array([b for _, b, _ in mst], dtype=np.int64)
+    segments = np.stack((xy[mst_u], xy[mst_v]), axis=1)  # One (start, end) segment per MST edge
+
+    # Draw everything that does not change between frames once
+    nodes = ax.scatter(xy[:, 0], xy[:, 1], s=8, c='#B0B0B0', zorder=2)  # Nodes
+    ax.add_collection(LineCollection(segments, colors='red', linewidths=0.5, zorder=1))  # All MST edges start red and thin
+    new_lines = LineCollection([], colors='#3D5C7E', linewidths=2, zorder=1, animated=True)  # MST edges added since the last frame
+    ax.add_collection(new_lines)
+    title = ax.set_title("", fontsize=16)
+
+    # Add live execution time and MST cost, along with computational cost on the left of the graph
+    texts = [
+        title,
+        ax.text(-0.1, 0.9, f"Total MST Cost: {mst_weight:.2f}", transform=ax.transAxes, ha="left", va="top", fontsize=12),
+        ax.text(-0.1, 0.85, f"Algorithm Execution Time: {algorithm_execution_time:.6f} sec", transform=ax.transAxes, ha="left", va="top", fontsize=12),
+        ax.text(-0.1, 0.8, f"Computational Cost: {computational_cost:.2f}", transform=ax.transAxes, ha="left", va="top", fontsize=12),
+    ]
+    for text in texts:
+        text.set_animated(True)  # Drawn over the edges each frame, so they are left out of the background
+
+    # Render the static figure once, every frame is then drawn on top of the previous one (blitting)
+    fig.canvas.draw()
+    background = fig.canvas.copy_from_bbox(fig.bbox)
+    drawn = 0  # Number of MST edges already drawn in blue on the background
+
+    # Function to update the animation frame (only the newly added edges and the text are drawn)
+    def update(frame):
+        nonlocal background, drawn
+        fig.canvas.restore_region(background)
+        new_lines.set_segments(segments[drawn:frame + 1])  # Draw MST edges added so far in a darker blue
+        ax.draw_artist(new_lines)
+        ax.draw_artist(nodes)  # Keep the nodes on top of the new edges
+        background = fig.canvas.copy_from_bbox(fig.bbox)  # The next frame starts from this one
+        drawn = frame + 1
+        title.set_text(f"Prim's Algorithm: Step {frame + 1}/{len(mst)}")
+        for text in texts:
+            ax.draw_artist(text)
+
     total_frames = len(mst)
-    
+    step = max(1, -(-total_frames // max_frames))  # Render every step-th frame (rounded up to stay within max_frames)
+    frames = list(range(0, total_frames, step))
+    if frames and frames[-1] != total_frames - 1:
+        frames.append(total_frames - 1)  # Always finish on the complete result
+
+    # Start FFmpeg reading raw RGBA frames, the canvas pixels are written to it directly (FFMpegWriter would redraw the whole figure)
+    width, height = fig.canvas.get_width_height()
+    ffmpeg = subprocess.Popen([matplotlib.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error',
+                               '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{width}x{height}', '-r', '30', '-i', 'pipe:',
+                               '-vcodec', 'h264', '-pix_fmt', 'yuv420p', output_video], stdin=subprocess.PIPE)
+
     # Create the animation with a progress bar
-    with tqdm(total=total_frames, desc="Rendering frames", ncols=100, unit="frame") as pbar:
-        with writer.saving(fig, output_video, dpi=100):
-            for i in range(total_frames):
-                update(i, computational_cost, algorithm_execution_time)
-                writer.grab_frame()
-                pbar.update(1)
+    with tqdm(total=len(frames), desc="Rendering frames", ncols=100, unit="frame") as pbar:
+        for i in frames:
+            update(i)
+            ffmpeg.stdin.write(fig.canvas.buffer_rgba())
+            pbar.update(1)
+    ffmpeg.stdin.close()
+    if ffmpeg.wait() != 0:
+        raise RuntimeError(f"FFmpeg failed to write '{output_video}'")
+    if own_figure:
+        plt.close(fig)
+    else:
+        ax.cla()  # Leave the reused figure empty for the next dataset
     
     print(f"Video saved as '{output_video}'")
 
     return computational_cost
 
-# Main function to handle multiple datasets
-def process_multiple_files(file_paths):
-    for index, file_path in enumerate(file_paths):
-        output_video = f"{index+1}_dataset_prim.mp4"
-        print(f"Processing {file_path}...")
-        computational_cost = create_mst_video(file_path, output_video)
-        print(f"Empirical Computational Cost for {file_path}: {computational_cost}")
+# Rough peak memory needed to process one dataset (edge arrays, layout and the figure)
+def estimate_memory(file_path):
+    num_nodes, _, num_entries, _, _, _ = mminfo(file_path)  # Only reads the file header
+    return num_entries * 64 + num_nodes * 64 + 200 * 2**20
+
+# Figure and axes reused for every dataset a worker process renders (created on first use)
+worker_figure = None
+
+# Function to process one dataset (kept at the top level so worker processes can run it)
+def process_file(index, file_path, max_frames, use_cache):
+    global worker_figure
+    if worker_figure is None:
+        worker_figure = plt.subplots(figsize=(12, 12))
+    fig, ax = worker_figure
+    output_video = f"{index+1}_dataset_prim.mp4"
+    print(f"Processing {file_path}...")
+    computational_cost = create_mst_video(file_path, output_video, max_frames, use_cache, fig, ax)
+    print(f"Empirical Computational Cost for {file_path}: {computational_cost}")
+    return computational_cost
+
+# Main function to handle multiple datasets (each dataset runs in its own process)
+def process_multiple_files(file_paths, max_frames=MAX_FRAMES, use_cache=True):
+    max_workers = min(len(file_paths), os.cpu_count() or 1)
+
+    # Warn if the datasets running at the same time may not fit in memory
+    try:
+        total_memory = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError):
+        total_memory = None  # Not available on this system
+    needed_memory = sum(sorted((estimate_memory(file_path) for file_path in file_paths), reverse=True)[:max_workers])
+    if total_memory is not None and needed_memory > total_memory:
+        print(f"Warning: processing {max_workers} datasets at once may need about {needed_memory / 2**30:.1f} GB "
+              f"but only {total_memory / 2**30:.1f} GB of RAM is available")
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(process_file, range(len(file_paths)), file_paths, repeat(max_frames), repeat(use_cache)))
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prim's MST on the selected networks")
+    parser.add_argument("--no-cache", action="store_true", help="reparse the graphs and recompute the node layouts instead of reusing cached ones")
+    args = parser.parse_args()
+
     file_paths = [
         "USAir97.mtx",
         "G13.mtx",
@@ -146,4 +327,4 @@ if __name__ == "__main__":
         "lhr04c.mtx",
         "amazon0302.mtx"
     ]
-    process_multiple_files(file_paths)
+    process_multiple_files(file_paths, use_cache=not args.no_cache)
@@ -1,56 +1,322 @@
-import networkx as nx  # used to create and manipulate graphs/networks.
+import igraph as ig  # used to compute the graph layout (in C) for drawing.
+import matplotlib  # used to pick a drawing backend that works without a display (in worker processes).
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt  # used for plotting graphs and visualizing results.
-from matplotlib.animation import FFMpegWriter  # Enables saving animations as .mp4 videos.
+from matplotlib.collections import LineCollection  # Draws many edges with a single call.
 import time  # used to measure execution time.
 from tqdm import tqdm  # used to show a progress bar
-from scipy.io import mmread  # mmread reads Matrix Market (.mtx) files (used for graph input).
+from scipy.io import mmread, mminfo  # mmread reads Matrix Market (.mtx) files (used for graph input), mminfo reads just their header.
+import numpy as np  # used for numerical operations, such as sorting the edge weights.
+import hashlib  # used to fingerprint input files for the graph and layout caches.
+import os  # used for file paths and folders, and to count the CPUs.
+import argparse  # used to read the command line options.
+import subprocess  # used to stream the frames to FFmpeg and join the video parts.
+import tempfile  # used for the folder holding the video parts.
+from concurrent.futures import ProcessPoolExecutor, as_completed  # used to process the datasets and render parts of their videos in parallel.
+from itertools import repeat  # used to pass the same options to every dataset.
+from scipy.sparse import coo_matrix  # used to build the sparse adjacency matrix for SciPy.
+from scipy.sparse.csgraph import minimum_spanning_tree  # C implementation of the MST.
+try:
+    from numba import njit  # used to compile the union-find loop to machine code.
+    NUMBA_AVAILABLE = True
+except ImportError:  # Without Numba the plain Python union-find below is used instead
+    NUMBA_AVAILABLE = False
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]  # Used as @njit
+        return lambda func: func  # Used as @njit(...)
+try:
+    import cupy  # used to check that a CUDA GPU is present.
+    import cudf  # used to hand the edge list to cuGraph on the GPU.
+    import cugraph  # GPU implementation of the MST (used for the largest graphs).
+    CUGRAPH_AVAILABLE = cupy.cuda.is_available()
+except Exception:  # Without RAPIDS, a GPU or a working driver (the imports can fail with other errors then) the MST is computed on the CPU
+    CUGRAPH_AVAILABLE = False
+
+# Types the compiled kernels are built for: node ids are int32, weights are int32, float32 or float64
+WEIGHT_TYPES = ['int32', 'float32', 'float64']
+
+# Folders where parsed graphs and computed node layouts are kept between runs
+GRAPH_CACHE_DIR = ".graph_cache"
+LAYOUT_CACHE_DIR = ".layout_cache"
+
+# Largest graph laid out with Kamada-Kawai (it needs all-pairs distances, so time and memory grow with N^2); bigger ones use grid Fruchterman-Reingold
+KAMADA_KAWAI_MAX_NODES = 2000
+
+# Most frames rendered per video (30 seconds at 30 fps), longer runs show every step-th MST edge addition
+MAX_FRAMES = 900
+
+# Fewest edges for which the MST is computed on the GPU when cuGraph is available (smaller graphs do not pay for the copy)
+GPU_MIN_EDGES = 500_000
+
+# Fewest frames given to one worker process (starting a worker and drawing its figure costs about as much as a few dozen frames)
+MIN_FRAMES_PER_WORKER = 50
+
+# Union-Find: find the root of x's component (with path halving, a single pass up the tree)
+@njit(cache=True)
+def _find(parent, x):
+    while parent[x] != x:  # Walk up until we reach the root
+        parent[x] = parent[parent[x]]  # Point x to its grandparent on the way up
+        x = parent[x]
+    return x
+
+# Compiled union-find loop: goes through the edges in reverse-delete order backwards (lightest first, given as order)
+# and keeps the ones joining two components, returns their indices (lightest first) and the total weight
+@njit([f'(int64[::1], int32[::1], int32[::1], {t}[::1], int64)' for t in WEIGHT_TYPES], cache=True, boundscheck=False)
+def _reverse_delete(order, u, v, w, N):
+    parent = np.arange(N, dtype=np.int32)  # Union-Find: each node starts as its own parent
+    size = np.ones(N, dtype=np.int32)  # Union-Find: number of nodes in each component
+    mst_idx = np.empty(max(N - 1, 0), np.int64)  # Indices of the edges added to the MST
+    num_mst = 0  # Number of MST edges found so far
+    total_weight = 0.0  # Total weight of MST
+
+    for i in order:  # Check all edges, lightest first
+        root_u = _find(parent, u[i])  # Component of u
+        root_v = _find(parent, v[i])  # Component of v
+        if root_u != root_v:  # Reverse-delete could never remove an edge joining two parts of the graph
+            if size[root_u] < size[root_v]:  # Attach the smaller tree to the larger one (union by size)
+                root_u, root_v = root_v, root_u
+            parent[root_v] = root_u
+            size[root_u] += size[root_v]
+            mst_idx[num_mst] = i  # Add edge to the MST
+            num_mst += 1
+            total_weight += w[i]
+            if num_mst == N - 1:  # The tree is complete, reverse-delete would remove every heavier edge left
+                break
+
+    return mst_idx[:num_mst], total_weight
+
+# Order of the edges by weight (smallest first, equal weights keep their order), the same as np.argsort(w, kind='stable')
+# 32-bit weights are turned into exact unsigned integer keys and sorted with 16-bit passes, which NumPy does with radix sort
+def weight_order(w):
+    if w.dtype == np.float64 or len(w) == 0:
+        return np.argsort(w, kind='stable')  # No exact 32-bit key for float64 weights
+    if w.dtype == np.float32:
+        bits = (w + np.float32(0)).view(np.uint32)  # Adding 0 turns -0.0 into 0.0 so they stay equal
+        key = np.where(bits >> 31, ~bits, bits | np.uint32(0x80000000))  # Unsigned integer order now matches float order
+    else:
+        low, high = int(w.min()), int(w.max())
+        if low == high:
+            return np.arange(len(w))  # All weights are equal (e.g. unit weights), the edges keep their order
+        if high - low < 2**16:
+            return np.argsort((w - low).astype(np.uint16), kind='stable')  # Small range, a single 16-bit pass is enough
+        key = (w.astype(np.int64) - low).astype(np.uint32)  # Shift integer weights to start at 0
+    order = np.argsort(key.astype(np.uint16), kind='stable')  # Sort by the low 16 bits first
+    high_bits = (key >> 16).astype(np.uint16)
+    if high_bits.any():
+        order = order[np.argsort(high_bits[order], kind='stable')]  # then by the high 16 bits (stable, so ties keep the low order)
+    return order
 
 # Reverse's Algorithm to find MST
-def reverse_delete_mst(G):
-    graph = G.copy()  # Make a copy so we don't change the original graph
+# Deleting the heaviest edge of a cycle until no cycle is left keeps exactly the edges that Kruskal keeps when it goes
+# through the same edge order backwards, so the edges are checked with a union-find instead of a connectivity search per edge
+# With use_scipy the tree comes from SciPy's compiled MST instead (same total weight, equal-weight edges may be picked differently)
+# With use_gpu it comes from cuGraph's MST on the GPU when that is available (the same holds for its tree), by default
+# only for graphs with at least GPU_MIN_EDGES edges and when SciPy would be used, so use_scipy=False always runs the union-find
+def reverse_delete_mst(u_arr, v_arr, w_arr, num_nodes, use_scipy=True, use_gpu=None):
+    # Edge i goes from u_arr[i] to v_arr[i] with weight w_arr[i]
+    if use_gpu is None:
+        use_gpu = use_scipy and len(w_arr) >= GPU_MIN_EDGES
+    if use_gpu and CUGRAPH_AVAILABLE:
+        edges = cudf.DataFrame({'src': u_arr, 'dst': v_arr, 'weight': w_arr.astype(np.float64)})  # Copied to the GPU
+        G = cugraph.Graph()  # Undirected graph
+        G.from_cudf_edgelist(edges, source='src', destination='dst', edge_attr='weight')
+        T = cugraph.minimum_spanning_tree(G).view_edge_list().to_pandas()  # Tree edges back on the CPU
+        row, col = T['src'].to_numpy(), T['dst'].to_numpy()
+        first_end, second_end = np.minimum(row, col), np.maximum(row, col)
+        _, once = np.unique(first_end.astype(np.int64) * num_nodes + second_end, return_index=True)  # Keep each tree edge once
+        row, col, data = first_end[once], second_end[once], T['weight'].to_numpy()[once]
+        order = np.argsort(-data, kind='stable')  # Heaviest first, the order reverse-delete confirms the edges in
+        mst_edges = list(zip(row[order].tolist(), col[order].tolist(), data[order].tolist()))
+        return mst_edges, float(data.sum())  # Return the MST edges and total cost
 
-    edges = sorted(graph.edges(data=True), key=lambda x: -x[2].get('weight', 1))  # Get all edges sorted in descending order of weight
+    if use_scipy:
+        # SciPy treats zero entries as missing edges, so zero weights are passed as the smallest positive float
+        tiny = np.finfo(np.float64).tiny
+        weights = np.where(w_arr == 0, tiny, w_arr).astype(np.float64)
+        csr = coo_matrix((weights, (u_arr, v_arr)), shape=(num_nodes, num_nodes)).tocsr()
+        T = minimum_spanning_tree(csr).tocoo()
+        T.data[T.data == tiny] = 0
+        order = np.argsort(-T.data, kind='stable')  # Heaviest first, the order reverse-delete confirms the edges in
+        mst_edges = list(zip(T.row[order].tolist(), T.col[order].tolist(), T.data[order].tolist()))
+        return mst_edges, float(T.data.sum())  # Return the MST edges and total cost
 
-    mst_edges = []  # List to store edges that will be in the MST
-    total_weight = 0  # Total weight of the MST
+    # Reverse-delete tries the edges heaviest first (equal weights in file order), the union-find walks that order backwards.
+    # Sorting the reversed weights and mapping the positions back gives it directly, without negating a copy of the weights
+    order = len(w_arr) - 1 - weight_order(w_arr[::-1])
 
-    for u, v, weight in edges:  # Go through edges from heaviest to lightest
-        graph.remove_edge(u, v)  # Try removing this edge from the graph
+    if NUMBA_AVAILABLE:
+        # Run the union-find loop in compiled code and map the kept edges back (heaviest first)
+        mst_idx, total_weight = _reverse_delete(order, u_arr, v_arr, w_arr, num_nodes)
+        mst_idx = mst_idx[::-1]
+        mst_edges = list(zip(u_arr[mst_idx].tolist(), v_arr[mst_idx].tolist(), w_arr[mst_idx].tolist()))
+        return mst_edges, total_weight  # Return the MST edges and total cost
 
-        # Check if the graph is still connected without this edge
-        if not nx.is_connected(graph):  
-            # If it's not connected anymore, that means this edge was necessary to keep the graph connected
-            graph.add_edge(u, v, weight=weight['weight'])  # So, it's part of the MST and we must add it back
-            mst_edges.append((u, v, weight['weight']))  # Add it to MST
-            total_weight += weight['weight']  # Add its weight to total
-        # Else the graph is still connected, we leave the edge removed (it's not needed in the MST)
+    parent = list(range(num_nodes))  # Union-Find: each node starts as its own parent
+    size = [1] * num_nodes  # Union-Find: number of nodes in each component
 
+    mst_idx = []  # Indices of the edges that will be in the MST
+    add_edge = mst_idx.append  # Bound once instead of looked up for every kept edge
+    last = num_nodes - 1  # Number of edges in a complete tree
+
+    # Go through edges from lightest to heaviest, only the indices and end points are pulled out (the weights are only needed for kept edges)
+    for i, root_u, root_v in zip(order.tolist(), u_arr[order].tolist(), v_arr[order].tolist()):
+        # Union-Find: find the roots of u and v (with path halving), written out here to save two function calls per edge
+        while parent[root_u] != root_u:
+            parent[root_u] = root_u = parent[parent[root_u]]  # Point the node to its grandparent and move up to it
+        while parent[root_v] != root_v:
+            parent[root_v] = root_v = parent[parent[root_v]]
+        if root_u != root_v:
+            # This edge is the only link between two parts of the graph, so reverse-delete could never remove it
+            if size[root_u] < size[root_v]:  # Attach the smaller tree to the larger one (union by size)
+                root_u, root_v = root_v, root_u
+            parent[root_v] = root_u
+            size[root_u] += size[root_v]
+            add_edge(i)  # Add it to MST
+            if len(mst_idx) == last:  # The tree is complete, reverse-delete would remove every heavier edge left
+                break
+        # Else the edge closes a cycle of lighter edges, reverse-delete would remove it (it's not needed in the MST)
+
+    mst_idx.reverse()  # Report the edges in the order reverse-delete confirms them (heaviest first)
+    weights = w_arr[mst_idx].tolist()
+    mst_edges = list(zip(u_arr[mst_idx].tolist(), v_arr[mst_idx].tolist(), weights))
+    total_weight = float(sum(reversed(weights)))  # Total weight of the MST (added up lightest first, like the edges were kept)
     return mst_edges, total_weight  # Return the MST edges and total cost
 
-# Function to load the graph from a file
-def load_graph(file_path):
-    # Load the graph data from a .mtx file
-    data = mmread(file_path).toarray()  # Turns the matrix into a 2D NumPy array
-    G = nx.from_numpy_array(data)  # Convert to NetworkX graph (from numpy array)
-
-    # Loop through all edges in the graph
-    for u, v, data in G.edges(data=True):
-        # If any edge has a negative weight
-        if data['weight'] < 0:
-            data['weight'] += 1.5  # Adjust negative weight to positive + 1.5
-            
-    return G # Return the final graph
-
-def create_mst_video(file_path, output_video="reverse_delete_mst_video.mp4"):
+# Function to load the graph from a file, the parsed edge arrays are cached on disk
+def load_graph(file_path, use_cache=True):
+    with open(file_path, 'rb') as f:
+        key = hashlib.md5(f.read()).hexdigest()  # Changes whenever the file contents change
+    cache_path = os.path.join(GRAPH_CACHE_DIR, f"reverse_v2_{key}.npz")  # v2: weights narrowed to int32/float32, older caches hold float64
+
+    if use_cache and os.path.exists(cache_path):
+        with np.load(cache_path) as cached:  # Reuse the edge arrays from an earlier run, skipping mmread
+            return cached['u'], cached['v'], cached['w'], int(cached['N'])
+
+    # Load the graph data from a .mtx file as a sparse matrix (only the non-zero entries are stored)
+    coo = mmread(file_path).tocoo()
+    coo.sum_duplicates()  # Repeated entries add up, like in the dense matrix
+    nonzero = coo.data != 0  # Zero entries are not edges
+    row, col, data = coo.row[nonzero], coo.col[nonzero], coo.data[nonzero]
+
+    # Keep every undirected edge once (symmetric files store each edge as both (i, j) and (j, i)).
+    # When both are stored, the lower-triangle value wins, the same as nx.from_numpy_array on the dense matrix.
+    first_end = np.minimum(row, col)
+    second_end = np.maximum(row, col)
+    order = np.lexsort((row < col, second_end, first_end))  # Group the copies of each edge, lower-triangle copy first
+    first_copy = np.ones(len(order), dtype=bool)
+    first_copy[1:] = (first_end[order][1:] != first_end[order][:-1]) | (second_end[order][1:] != second_end[order][:-1])
+    edges = order[first_copy]
+
+    # Edge i goes from u[i] to v[i] with weight w[i] (node ids are stored in 4 bytes, so graphs above 2^31 nodes are not supported)
+    u = first_end[edges].astype(np.int32)
+    v = second_end[edges].astype(np.int32)
+    w = data[edges].astype(np.float64)
+    w[w < 0] += 1.5  # Adjust negative weights to positive + 1.5 (one vectorised pass over the kept edges only)
+
+    # Store the weights in 4 bytes where that stays exact enough (halves the memory read by the sort and the union-find loop)
+    max_weight = np.abs(w).max(initial=0)
+    if np.all(w == np.floor(w)) and max_weight < 2**31:
+        w = w.astype(np.int32)  # Integer weights (e.g. unit weights) are kept as integers
+    elif max_weight < 2**24:
+        w = w.astype(np.float32)  # Larger values keep float64 so big weights are not rounded
+
+    N = coo.shape[0]  # Number of nodes
+    if use_cache:
+        os.makedirs(GRAPH_CACHE_DIR, exist_ok=True)
+        temp_path = f"{cache_path}.{os.getpid()}.npz"  # Written under a temporary name so a parallel run never reads half a file
+        np.savez(temp_path, u=u, v=v, w=w, N=N)
+        os.replace(temp_path, cache_path)
+    return u, v, w, N  # Return the edge arrays and the number of nodes
+
+# Function to lay out the nodes, cached on disk per input file so reruns skip the layout
+def compute_layout(file_path, N, mst, use_cache=True):
+    with open(file_path, 'rb') as f:
+        key = hashlib.md5(f.read()).hexdigest()  # Changes whenever the file contents change
+    cache_path = os.path.join(LAYOUT_CACHE_DIR, f"reverse_mst_{key}.npy")
+
+    if use_cache and os.path.exists(cache_path):
+        return np.load(cache_path)  # Reuse the layout from an earlier run
+
+    # Lay out just the MST (N-1 edges instead of all E), it is only used for the drawing
+    g = ig.Graph(n=N, edges=[(a, b) for a, b, _ in mst])
+    if N <= KAMADA_KAWAI_MAX_NODES:
+        pos = np.array(g.layout_kamada_kawai().coords)  # Kamada-Kawai layout (row i is the position of node i)
+    else:
+        # Fixed starting positions so reruns give the same picture, spread around the origin like igraph's own random start
+        # (the grid it uses to find nearby nodes is centred there, packing the nodes into a corner makes it very slow)
+        seed = ((np.random.default_rng(0).random((N, 2)) - 0.5) * np.sqrt(N)).tolist()
+        pos = np.array(g.layout_fruchterman_reingold(seed=seed, niter=50, grid=True).coords)  # Close to linear in N
+
+    if use_cache:
+        os.makedirs(LAYOUT_CACHE_DIR, exist_ok=True)
+        np.save(cache_path, pos)
+    return pos
+
+# Function to render a run of consecutive frames into its own video file (kept at the top level so worker processes can run it)
+def render_frames(output_video, frames, xy, segments, texts):
+    # Prepare the figure and axes for animation
+    fig, ax = plt.subplots(figsize=(12, 12))
+    ax.axis('off')
+
+    # Draw everything that does not change between frames once
+    first = frames[0] if frames else 0  # MST edges before the first frame of this run are already blue
+    ax.scatter(xy[:, 0], xy[:, 1], s=8, c='#B0B0B0', zorder=2)  # Nodes
+    ax.add_collection(LineCollection(segments[first:], colors='red', linewidths=0.5, zorder=1))  # MST edges still to come
+    ax.add_collection(LineCollection(segments[:first], colors='#3D5C7E', linewidths=2, zorder=1))  # MST edges added so far
+    new_lines = LineCollection([], colors='#3D5C7E', linewidths=2, zorder=1, animated=True)  # MST edges added since the last frame
+    ax.add_collection(new_lines)
+    new_nodes = ax.scatter([], [], s=8, c='#B0B0B0', zorder=2, animated=True)  # End points of the new edges, drawn back over them
+    title = ax.set_title("", fontsize=16)
+    labels = [title] + [ax.text(-0.1, 0.9 - 0.05 * k, text, transform=ax.transAxes, ha="left", va="top", fontsize=12)
+                        for k, text in enumerate(texts)]
+    for label in labels:
+        label.set_animated(True)  # Drawn over the edges each frame, so they are left out of the background
+
+    # Render the static figure once, every frame is then drawn on top of the previous one (blitting)
+    fig.canvas.draw()
+    background = fig.canvas.copy_from_bbox(fig.bbox)
+    drawn = first  # Number of MST edges already drawn in blue on the background
+
+    # Function to update the animation frame (only the newly added edges and the text are drawn)
+    def update(frame):
+        nonlocal background, drawn
+        fig.canvas.restore_region(background)
+        new_lines.set_segments(segments[drawn:frame + 1])  # Draw MST edges added so far in a darker blue
+        ax.draw_artist(new_lines)
+        new_nodes.set_offsets(segments[drawn:frame + 1].reshape(-1, 2))  # Keep the nodes on top of the new edges (only the ones they touch)
+        ax.draw_artist(new_nodes)
+        background = fig.canvas.copy_from_bbox(fig.bbox)  # The next frame starts from this one
+        drawn = frame + 1
+        title.set_text(f"Reverse-Delete Algorithm: Step {frame + 1}/{len(segments)}")
+        for label in labels:
+            ax.draw_artist(label)
+
+    # Start FFmpeg reading raw RGBA frames, the canvas pixels are written to it directly (no PNG encoding or full redraw per frame)
+    width, height = fig.canvas.get_width_height()
+    ffmpeg = subprocess.Popen([matplotlib.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error',
+                               '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{width}x{height}', '-r', '30', '-i', 'pipe:',
+                               '-vcodec', 'h264', '-pix_fmt', 'yuv420p', output_video], stdin=subprocess.PIPE)
+    for i in frames:
+        update(i)
+        ffmpeg.stdin.write(fig.canvas.buffer_rgba())
+    ffmpeg.stdin.close()
+    if ffmpeg.wait() != 0:
+        raise RuntimeError(f"FFmpeg failed to write '{output_video}'")
+    plt.close(fig)
+
+    return len(frames)  # Number of frames rendered
+
+def create_mst_video(file_path, output_video="reverse_delete_mst_video.mp4", max_frames=MAX_FRAMES, use_cache=True, render_workers=None):
     # Load graph from file
-    G = load_graph(file_path)
-    print(f"Loaded graph with {len(G.nodes)} nodes and {len(G.edges)} edges")
+    u, v, w, N = load_graph(file_path, use_cache)
+    print(f"Loaded graph with {N} nodes and {len(u)} edges")
 
     # Start timer for the algorithm execution time
     start_time_algorithm = time.time()
 
     # Run Reverse-Delete Algorithm to find the MST
-    mst, mst_weight = reverse_delete_mst(G)
+    mst, mst_weight = reverse_delete_mst(u, v, w, N)
 
     # Stop timer for the algorithm execution time
     end_time_algorithm = time.time()
@@ -61,66 +327,101 @@ def create_mst_video(file_path, output_video="reverse_delete_mst_video.mp4"):
 
     print(f"MST has {len(mst)} edges with total weight: {mst_weight}")
     
-    # Prepare the figure and axes for animation
-    fig, ax = plt.subplots(figsize=(12, 12))
-    ax.axis('off')
-    pos = nx.kamada_kawai_layout(G)  # Layout for nodes
+    xy = compute_layout(file_path, N, mst, use_cache)  # Node positions (row i is the position of node i)
     
     # Calculate the computational cost (empirical complexity)
-    computational_cost = len(G.edges) * len(G.nodes)  # O(E*V)
+    computational_cost = len(u) * N  # O(E*V)
     print(f"Computational cost (empirical complexity): {computational_cost}")
     
-    # Function to update the animation frame
-    def update(frame, computational_cost, algorithm_execution_time):
-        ax.clear()
-        ax.axis('off')
-        ax.set_title(f"Reverse-Delete Algorithm: Step {frame + 1}/{len(mst)}", fontsize=16)
-        
-        # Draw nodes
-        nx.draw_networkx_nodes(G, pos, ax=ax, node_size=8, node_color='#B0B0B0')
-        
-        # Draw MST edges added so far in a darker blue
-        for i in range(frame + 1):
-            u, v, weight = mst[i]
-            color = '#3D5C7E'
-            nx.draw_networkx_edges(G, pos, edgelist=[(u, v)], edge_color=color, width=2, ax=ax)
-        
-        # Draw remaining edges in red
-        remaining_edges = mst[frame + 1:]
-        for u, v, weight in remaining_edges:
-            color = 'red'
-            nx.draw_networkx_edges(G, pos, edgelist=[(u, v)], edge_color=color, width=0.5, ax=ax)
-        
-        # Add live execution time and MST cost, along with computational cost
-        ax.text(-0.1, 0.9, f"Total MST Cost: {mst_weight:.2f}", transform=ax.transAxes, ha="left", va="top", fontsize=12)
-        ax.text(-0.1, 0.85, f"Algorithm Execution Time: {algorithm_execution_time:.6f} sec", transform=ax.transAxes, ha="left", va="top", fontsize=12)
-        ax.text(-0.1, 0.8, f"Computational Cost: {computational_cost:.2f}", transform=ax.transAxes, ha="left", va="top", fontsize=12)
-    
-    # Initialize the video writer using FFmpeg
-    writer = FFMpegWriter(fps=30)
-    
+    # The two end points of every MST edge
+    mst_u = np.array([a for a, _, _ in mst], dtype=np.int64)
+    mst_v = np.array([b for _, b, _ in mst], dtype=np.int64)
+    segments = np.stack((xy[mst_u], xy[mst_v]), axis=1)  # One (start, end) segment per MST edge
+
     total_frames = len(mst)
-    
-    # Create the animation with a progress bar
-    with tqdm(total=total_frames, desc="Rendering frames", ncols=100, unit="frame") as pbar:
-        with writer.saving(fig, output_video, dpi=100):
-            for i in range(total_frames):
-                update(i, computational_cost, algorithm_execution_time)
-                writer.grab_frame()
-                pbar.update(1)
+    step = max(1, -(-total_frames // max_frames))  # Render every step-th frame (rounded up to stay within max_frames)
+    frames = np.arange(0, total_frames, step)
+    if len(frames) and frames[-1] != total_frames - 1:
+        frames = np.append(frames, total_frames - 1)  # Always finish on the complete result
+
+    # Live execution time and MST cost, along with computational cost
+    texts = [
+        f"Total MST Cost: {mst_weight:.2f}",
+        f"Algorithm Execution Time: {algorithm_execution_time:.6f} sec",
+        f"Computational Cost: {computational_cost:.2f}",
+    ]
+    if step > 1:
+        texts.append(f"Frame Stride: {step} steps per frame")  # Long runs are sampled to stay within max_frames
+
+    if len(frames) == 0:
+        # No MST edges (e.g. a graph without edges), there is nothing to split or join, so the empty video is written here
+        render_frames(output_video, [], xy, segments, texts)
+        print(f"Video saved as '{output_video}'")
+        return computational_cost
+
+    # Split the frames into consecutive runs, each worker process renders one run into its own video part
+    num_workers = max(1, min(render_workers or os.cpu_count() or 1, len(frames) // MIN_FRAMES_PER_WORKER))
+    parts = np.array_split(frames, num_workers)
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_video))) as part_dir:
+        part_paths = [os.path.join(part_dir, f"part_{k}.mp4") for k in range(num_workers)]
+
+        # Create the animation with a progress bar (it moves on each time a part is finished)
+        with tqdm(total=len(frames), desc="Rendering frames", ncols=100, unit="frame") as pbar:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                futures = [executor.submit(render_frames, part_path, part.tolist(), xy, segments, texts)
+                           for part_path, part in zip(part_paths, parts)]
+                for future in as_completed(futures):
+                    pbar.update(future.result())
+
+        # Join the parts in order without re-encoding them
+        list_path = os.path.join(part_dir, "parts.txt")
+        with open(list_path, 'w') as f:
+            f.writelines(f"file '{part_path}'\n" for part_path in part_paths)
+        subprocess.run([matplotlib.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                        '-i', list_path, '-c', 'copy', output_video], check=True)
     
     print(f"Video saved as '{output_video}'")
 
     return computational_cost
 
-def process_multiple_files(file_paths):
-    for index, file_path in enumerate(file_paths):
-        output_video = f"{index+1}_dataset_reverse_delete.mp4"
-        print(f"Processing {file_path}...")
-        computational_cost = create_mst_video(file_path, output_video)
-        print(f"Empirical Computational Cost for {file_path}: {computational_cost}")
+# Rough peak memory needed to process one dataset (edge arrays, layout and the figures of its render workers)
+def estimate_memory(file_path, render_workers):
+    num_nodes, _, num_entries, _, _, _ = mminfo(file_path)  # Only reads the file header
+    return num_entries * 64 + num_nodes * 64 + render_workers * (num_nodes * 64 + 200 * 2**20)
+
+# Function to process one dataset (kept at the top level so worker processes can run it)
+def process_file(index, file_path, max_frames, use_cache, render_workers):
+    output_video = f"{index+1}_dataset_reverse_delete.mp4"
+    print(f"Processing {file_path}...")
+    computational_cost = create_mst_video(file_path, output_video, max_frames, use_cache, render_workers)
+    print(f"Empirical Computational Cost for {file_path}: {computational_cost}")
+    return computational_cost
+
+# Main function to handle multiple datasets (each dataset runs in its own process)
+def process_multiple_files(file_paths, max_frames=MAX_FRAMES, use_cache=True):
+    num_cpus = os.cpu_count() or 1
+    max_workers = min(len(file_paths), num_cpus)
+    render_workers = max(1, num_cpus // max_workers)  # Each dataset renders its video with its share of the CPUs
+
+    # Warn if the datasets running at the same time may not fit in memory
+    try:
+        total_memory = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError):
+        total_memory = None  # Not available on this system
+    needed_memory = sum(sorted((estimate_memory(file_path, render_workers) for file_path in file_paths), reverse=True)[:max_workers])
+    if total_memory is not None and needed_memory > total_memory:
+        print(f"Warning: processing {max_workers} datasets at once may need about {needed_memory / 2**30:.1f} GB "
+              f"but only {total_memory / 2**30:.1f} GB of RAM is available")
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(process_file, range(len(file_paths)), file_paths, repeat(max_frames), repeat(use_cache), repeat(render_workers)))
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reverse-Delete MST on the selected networks")
+    parser.add_argument("--no-cache", action="store_true", help="reparse the graphs and recompute the node layouts instead of reusing cached ones")
+    args = parser.parse_args()
+
     file_paths = [
         "USAir97.mtx",
         "G13.mtx",
@@ -128,4 +429,4 @@ if __name__ == "__main__":
         "lhr04c.mtx",
         "amazon0302.mtx"
     ]
-    process_multiple_files(file_paths)
+    process_multiple_files(file_paths, use_cache=not args.no_cache)